@@ -0,0 +1,249 @@
+"""Cubo de medidas aditivas e consultas derivadas usadas pelas abas do dashboard."""
+import pandas as pd
+
+from dados import concatenar, mes_de
+from filtros import DIMENSOES_FILTRO
+
+
+# Granularidade do cubo: dia do pedido (e não mês) para que o filtro de
+# período continue exato, e só as dimensões do filtro, para que o número de
+# células não acompanhe o de pedidos; "mes" é derivado do dia. Rotas (hub →
+# destino) ficam num cubo mensal à parte (rotas.py).
+DIMENSOES = ("data_pedido", *DIMENSOES_FILTRO)
+
+# Medidas aditivas: contagens e somas inteiras, que podem ser reagregadas em
+# qualquer ordem sem erro de arredondamento (custo em centavos)
+MEDIDAS = (
+    "pedidos", "custo_centavos", "prazo_real", "prazo_estimado",
+    "atraso", "no_prazo", "atrasados", "atraso_atrasados",
+)
+
+# Combinações de chaves consumidas pelas abas do dashboard: as funções
+# tabelas_* recebem o resultado de resumir_varios(cubo, CHAVES_ABAS)
+CHAVES_ABAS = (
+    ("transportadora",),
+    ("cidade_origem",),
+    ("mes", "transportadora"),
+    ("cidade_origem", "transportadora"),
+    ("cidade_origem", "cidade_destino"),
+)
+
+# Chaves das rotas, servidas pelo cubo de rotas; as demais saem do cubo diário
+CHAVES_ROTAS = ("cidade_origem", "cidade_destino")
+CHAVES_CUBO = tuple(c for c in CHAVES_ABAS if c != CHAVES_ROTAS)
+
+
+def medidas_linhas(df):
+    """MEDIDAS de cada linha do frame enriquecido (um pedido por linha)."""
+    medidas = pd.DataFrame({
+        "pedidos":          1,
+        "custo_centavos":   (df["custo_transporte"].astype("float64") * 100).round().astype("int64"),
+        "prazo_real":       df["prazo_real_dias"].astype("int64"),
+        "prazo_estimado":   df["prazo_estimado_dias"].astype("int64"),
+        "atraso":           df["atraso_dias"].astype("int64"),
+        "no_prazo":         df["no_prazo"].astype("int64"),
+        "atraso_atrasados": df["atraso_dias"].clip(lower=0).astype("int64"),
+    }, index=df.index)
+
+    medidas["atrasados"] = medidas["pedidos"] - medidas["no_prazo"]
+    return medidas
+
+
+def construir_cubo(df, dimensoes=DIMENSOES):
+    """Materializa o cubo (dimensões × MEDIDAS) a partir do frame enriquecido.
+
+    A primeira dimensão é a de data (dia, ou "mes" num cubo mensal).
+    """
+    medidas = medidas_linhas(df)
+    return _consolidar(medidas.groupby([df[d] for d in dimensoes], observed=True, sort=False), dimensoes)
+
+
+def _consolidar(grupos, dimensoes):
+    """Soma as medidas por célula, ordena por data e deriva o mês."""
+    cubo = (
+        grupos[list(MEDIDAS)].sum()
+        .reset_index()
+        .sort_values(dimensoes[0], kind="stable", ignore_index=True)
+    )
+    if "mes" not in dimensoes:
+        cubo["mes"] = mes_de(cubo["data_pedido"])
+    return cubo
+
+
+def mesclar_cubos(*cubos, dimensoes=DIMENSOES):
+    """Soma cubos parciais, p.ex. o cubo atual e o cubo das linhas recém-chegadas."""
+    juntos = concatenar(cubos)
+    return _consolidar(juntos.groupby(list(dimensoes), observed=True, sort=False), dimensoes)
+
+
+def derivar(t):
+    """Acrescenta médias e taxas calculadas a partir das medidas aditivas."""
+    n = t["pedidos"]
+    custo = t["custo_centavos"] / 100
+    return t.assign(
+        custo         = custo,
+        otd           = t["no_prazo"] / n,
+        taxa_atraso   = t["atrasados"] / n,
+        tempo_medio   = t["prazo_real"] / n,
+        custo_medio   = custo / n,
+        atraso_medio  = t["atraso"] / n,
+        custo_por_otd = custo / t["no_prazo"],
+    )
+
+
+def resumir_varios(cubo, conjuntos):
+    """Agrega o cubo para vários conjuntos de chaves numa única passada.
+
+    A seleção é percorrida uma vez, na granularidade da união das chaves; cada
+    conjunto pedido é um rollup desse resultado intermediário (bem menor que a
+    seleção). Retorna {tupla de chaves: tabela com medidas, médias e taxas}.
+    """
+    conjuntos = [tuple(c) for c in conjuntos]
+    uniao = list(dict.fromkeys(k for c in conjuntos for k in c))
+    base = cubo.groupby(uniao, observed=True)[list(MEDIDAS)].sum()
+    return {
+        c: derivar(base.groupby(level=list(c), observed=True).sum().reset_index())
+        for c in conjuntos
+    }
+
+
+def resumir(cubo, chaves):
+    """Reagrega o cubo pelas chaves informadas, com médias e taxas derivadas."""
+    return resumir_varios(cubo, [chaves])[tuple(chaves)]
+
+
+def kpis(cubo, rotas):
+    """Indicadores do topo da página para a seleção atual do cubo e suas rotas."""
+    return kpis_de_somas(cubo[list(MEDIDAS)].sum(), rotas["cidade_destino"].nunique())
+
+
+def kpis_de_somas(somas, destinos):
+    """Indicadores a partir das somas das medidas e do nº de destinos distintos."""
+    total     = int(somas["pedidos"])
+    custo     = somas["custo_centavos"] / 100
+    no_prazo  = int(somas["no_prazo"])
+    atrasados = int(somas["atrasados"])
+    return {
+        "total_pedidos":  total,
+        "no_prazo":       no_prazo,
+        "custo_total":    custo,
+        "custo_medio":    custo / total,
+        "otd_pct":        no_prazo / total * 100,
+        "tempo_medio":    somas["prazo_real"] / total,
+        "prazo_estimado": somas["prazo_estimado"] / total,
+        "atraso_medio":   somas["atraso_atrasados"] / atrasados if atrasados else 0,
+        "pct_atrasados":  atrasados / total * 100,
+        "destinos":       int(destinos),
+    }
+
+
+def tabelas_performance(ag):
+    """Tabelas da aba Performance."""
+    por_transp = ag[("transportadora",)]
+    return {
+        "tempo": (
+            por_transp[["transportadora", "tempo_medio"]]
+            .rename(columns={"tempo_medio": "prazo_real_dias"})
+            .sort_values("prazo_real_dias", ascending=True)
+        ),
+        "otd": (
+            por_transp[["transportadora", "otd"]]
+            .assign(otd=lambda d: d["otd"] * 100)
+            .sort_values("otd", ascending=True)
+        ),
+        "trend": (
+            ag[("mes", "transportadora")]
+            [["mes", "transportadora", "otd"]]
+            .assign(otd=lambda d: d["otd"] * 100)
+        ),
+        "hub": (
+            ag[("cidade_origem",)]
+            [["cidade_origem", "pedidos", "otd", "tempo_medio", "custo_medio"]]
+            .rename(columns={"pedidos": "volume", "tempo_medio": "tempo", "custo_medio": "custo"})
+            .sort_values("volume", ascending=False)
+        ),
+    }
+
+
+def tabelas_mapa(ag):
+    """Tabelas da aba Mapa & Fluxos (rotas sem coordenadas)."""
+    routes = (
+        ag[("cidade_origem", "cidade_destino")]
+        [["cidade_origem", "cidade_destino", "pedidos", "atraso_medio", "custo"]]
+        .rename(columns={"pedidos": "volume", "custo": "custo_total"})
+    )
+    avg_atraso_global = routes["atraso_medio"].mean()
+    routes["is_delayed"] = routes["atraso_medio"] > avg_atraso_global
+
+    por_hub_transp = ag[("cidade_origem", "transportadora")]
+    return {
+        "routes": routes,
+        "avg_atraso_global": avg_atraso_global,
+        "hub_map": (
+            ag[("cidade_origem",)]
+            [["cidade_origem", "pedidos", "otd"]]
+            .rename(columns={"pedidos": "volume"})
+        ),
+        "flow": (
+            por_hub_transp[["cidade_origem", "transportadora", "pedidos", "taxa_atraso"]]
+            .rename(columns={"pedidos": "volume"})
+        ),
+        "heat": (
+            por_hub_transp
+            .pivot(index="cidade_origem", columns="transportadora", values="atraso_medio")
+            .round(1)
+        ),
+    }
+
+
+def tabelas_custos(ag):
+    """Tabelas da aba Análise de Custos."""
+    eff = (
+        ag[("cidade_origem",)]
+        [["cidade_origem", "custo", "custo_medio", "pedidos", "otd", "custo_por_otd"]]
+        .rename(columns={
+            "custo": "custo_total", "pedidos": "volume", "custo_por_otd": "custo_por_entrega_otd",
+        })
+    )
+    eff["otd"]                   = (eff["otd"] * 100).round(1)
+    eff["custo_medio"]           = eff["custo_medio"].round(2)
+    eff["custo_total"]           = eff["custo_total"].round(2)
+    eff["custo_por_entrega_otd"] = eff["custo_por_entrega_otd"].round(2)
+    eff.columns = [
+        "Hub", "Custo Total (R$)", "Custo Médio (R$)",
+        "Volume", "OTD (%)", "Custo / Entrega no Prazo (R$)",
+    ]
+    return {
+        "tree": (
+            ag[("cidade_origem", "transportadora")]
+            [["cidade_origem", "transportadora", "custo"]]
+            .rename(columns={"custo": "custo_transporte"})
+        ),
+        "ct": (
+            ag[("transportadora",)]
+            [["transportadora", "custo_medio"]]
+            .rename(columns={"custo_medio": "custo_transporte"})
+            .sort_values("custo_transporte", ascending=True)
+        ),
+        "cm": (
+            ag[("mes", "transportadora")]
+            [["mes", "transportadora", "custo"]]
+            .rename(columns={"custo": "custo_transporte"})
+        ),
+        "eff": eff,
+    }
+
+
+def tabelas_decisao(ag):
+    """Agregados da aba Decisões para Gestão."""
+    transp = ag[("transportadora",)].set_index("transportadora")
+    return {
+        "transp_otd":   transp["otd"],
+        "transp_custo": transp["custo_medio"],
+        "hub_otd":      ag[("cidade_origem",)].set_index("cidade_origem")["otd"],
+        "combo": (
+            ag[("cidade_origem", "transportadora")]
+            [["cidade_origem", "transportadora", "otd", "pedidos", "atraso_medio"]]
+            .rename(columns={"pedidos": "volume", "atraso_medio": "atraso"})
+        ),
+    }
@@ -0,0 +1,153 @@
+"""Amostra estratificada (transportadora × hub × mês) para o modo aproximado."""
+import numpy as np
+import pandas as pd
+
+from agregacoes import CHAVES_ABAS, MEDIDAS, kpis_de_somas, medidas_linhas, resumir_varios
+from filtros import DIMENSOES_FILTRO, IndiceFiltro
+
+
+ESTRATOS = ("transportadora", "cidade_origem", "mes")
+
+# Agregados das abas que podem ser estimados: chaves contidas nos estratos
+CHAVES_AMOSTRA = tuple(c for c in CHAVES_ABAS if set(c) <= set(ESTRATOS))
+
+# Linhas por estrato em cada nível de refinamento; depois do último vem o exato
+NIVEIS = (100, 1_000, 10_000)
+
+# Quantil da normal para intervalos de confiança de 95%
+Z95 = 1.96
+
+# Métricas com intervalo: numerador, denominador (None = total) e escala
+METRICAS = {
+    "pedidos":      ("pedidos", None, 1),
+    "custo":        ("custo_centavos", None, 0.01),
+    "otd":          ("no_prazo", "pedidos", 1),
+    "taxa_atraso":  ("atrasados", "pedidos", 1),
+    "tempo_medio":  ("prazo_real", "pedidos", 1),
+    "custo_medio":  ("custo_centavos", "pedidos", 0.01),
+    "atraso_medio": ("atraso_atrasados", "atrasados", 1),
+}
+
+
+class AmostraEstratificada:
+    """Amostra aninhada por estrato, com estimadores e intervalos de confiança.
+
+    As linhas de cada estrato são embaralhadas uma vez; o nível k usa as
+    primeiras NIVEIS[k] de cada estrato (o tamanho da amostra não depende do
+    tamanho da base, só do número de estratos). Qualquer seleção da barra
+    lateral é um domínio: totais são expandidos pelo peso N_h/n_h e médias e
+    taxas são razões de totais, com variância por linearização.
+    """
+
+    def __init__(self, frame, niveis=NIVEIS, semente=0):
+        grupos = frame.groupby(list(ESTRATOS), observed=True, dropna=False)
+        codigo = grupos.ngroup().to_numpy()
+        tamanhos = grupos.size()
+        self.estratos = tamanhos.index.to_frame(index=False)
+        self.populacao = tamanhos.to_numpy()
+        # Só os níveis que ainda deixam algum estrato incompleto
+        self.niveis = tuple(n for n in niveis if n < self.populacao.max())
+
+        # Posição de cada linha dentro do seu estrato, em ordem aleatória
+        rng = np.random.default_rng(semente)
+        ordem = np.lexsort((rng.random(len(codigo)), codigo))
+        cod_ord = codigo[ordem]
+        inicio = np.searchsorted(cod_ord, np.arange(len(self.populacao)))
+        posicao = np.arange(len(ordem)) - inicio[cod_ord]
+        manter = posicao < (self.niveis[-1] if self.niveis else 0)
+
+        linhas = frame.take(ordem[manter])
+        amostra = pd.concat([
+            linhas[["data_pedido", *DIMENSOES_FILTRO, "cidade_destino", "mes"]],
+            medidas_linhas(linhas),
+        ], axis=1).reset_index(drop=True)
+        amostra["estrato"] = cod_ord[manter]
+        amostra["ordem"] = posicao[manter]
+        self.indice = IndiceFiltro(amostra)
+
+    def __len__(self):
+        return len(self.indice)
+
+    def _tamanhos(self, nivel):
+        return np.minimum(self.populacao, self.niveis[nivel]).astype("float64")
+
+    def selecionar(self, nivel, data_inicio, data_fim, **filtros):
+        """Linhas da amostra do nível que atendem ao período e aos filtros."""
+        sel = self.indice.filtrar(data_inicio, data_fim, **filtros)
+        return sel[sel["ordem"].to_numpy() < self.niveis[nivel]]
+
+    def estimar(self, sel, nivel):
+        """Seleção com as medidas expandidas pelo peso do estrato (cubo estimado)."""
+        n_h = self._tamanhos(nivel)
+        peso = (self.populacao / n_h)[sel["estrato"].to_numpy()]
+        return sel.assign(**{m: sel[m].to_numpy() * peso for m in MEDIDAS})
+
+    def resumir(self, sel, nivel, conjuntos):
+        """Como `resumir_varios`, estimado; as chaves devem estar contidas em ESTRATOS."""
+        return resumir_varios(self.estimar(sel, nivel), conjuntos)
+
+    def kpis(self, sel, nivel):
+        """KPIs estimados e, em "ic", a meia-largura do IC 95% de cada um.
+
+        "destinos" é o número de destinos distintos vistos na amostra.
+        """
+        est = self.estimar(sel, nivel)
+        k = kpis_de_somas(est[list(MEDIDAS)].sum().round(), est["cidade_destino"].nunique())
+        ic = self.intervalos(sel, nivel).iloc[0]
+        k["ic"] = {
+            "total_pedidos": ic["ic_pedidos"],
+            "custo_total":   ic["ic_custo"],
+            "custo_medio":   ic["ic_custo_medio"],
+            "otd_pct":       ic["ic_otd"] * 100,
+            "pct_atrasados": ic["ic_taxa_atraso"] * 100,
+            "tempo_medio":   ic["ic_tempo_medio"],
+            "atraso_medio":  ic["ic_atraso_medio"],
+        }
+        return k
+
+    def intervalos(self, sel, nivel, chaves=()):
+        """Meia-largura do IC 95% de cada métrica de METRICAS, por grupo de `chaves`.
+
+        As chaves devem estar contidas em ESTRATOS: cada grupo é uma união de
+        estratos e a variância do grupo é a soma das variâncias deles. Retorna
+        as chaves e as colunas ic_<métrica> (OTD e taxas como fração).
+        """
+        n_h = self._tamanhos(nivel)
+        N_h = self.populacao
+        # N²(1 - f)/n: fator da variância do total expandido, sem reposição
+        fator = N_h ** 2 * (1 - n_h / N_h) / n_h
+
+        if chaves:
+            por_grupo = self.estratos.groupby(list(chaves), observed=True, dropna=False)
+            grupo = por_grupo.ngroup().to_numpy()
+            tabela = por_grupo.size().index.to_frame(index=False)
+        else:
+            grupo = np.zeros(len(N_h), dtype="int64")
+            tabela = pd.DataFrame(index=[0])
+        estrato = sel["estrato"].to_numpy()
+        peso = (N_h / n_h)[estrato]
+        g = grupo[estrato]
+
+        def total(v):
+            return np.bincount(g, v * peso, minlength=len(tabela))
+
+        def variancia(v):
+            # Linhas do estrato fora da seleção contam como zero (estimação por domínio)
+            s1 = np.bincount(estrato, v, minlength=len(N_h))
+            s2 = np.bincount(estrato, v * v, minlength=len(N_h))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                s2_h = np.where(n_h > 1, (s2 - s1 ** 2 / n_h) / (n_h - 1), 0.0)
+            return np.bincount(grupo, fator * np.maximum(s2_h, 0), minlength=len(tabela))
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for nome, (num, den, escala) in METRICAS.items():
+                y = sel[num].to_numpy("float64")
+                if den is None:
+                    tabela[f"ic_{nome}"] = Z95 * np.sqrt(variancia(y)) * escala
+                    continue
+                x = sel[den].to_numpy("float64")
+                X = total(x)
+                razao = total(y) / X
+                z = y - np.nan_to_num(razao)[g] * x
+                tabela[f"ic_{nome}"] = Z95 * np.sqrt(variancia(z)) / X * escala
+        return tabela
@@ -1,10 +1,35 @@
-import streamlit as st
-import pandas as pd
-import numpy as np
 import hashlib
+import os
+import time
+
+import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
 
+from agregacoes import (
+    CHAVES_ABAS, CHAVES_CUBO, CHAVES_ROTAS, kpis, resumir_varios,
+    tabelas_custos, tabelas_decisao, tabelas_mapa, tabelas_performance,
+)
+from amostra import CHAVES_AMOSTRA
+from base import BaseDados
+from dados import CACHE_DIR, FONTE
+from exportacao import EXTENSOES, exportar, formatos, limpar_exportacoes
+from mapa import com_coordenadas
+from memo import MAX_BYTES, CacheLRU
+from motor_sql import MOTOR, MotorSQL
+from particoes import INTERVALO_INDEXACAO, DatasetParticionado
+from pedidos import (
+    COLUNAS_PEDIDOS, TAMANHO_PAGINA, ExploradorPedidos, filtrar_posicoes, ordenar_posicoes, pagina,
+)
+from perfil import Perfil
+from precalculo import carregar_precalculo, chave_selecao
+from previsao import HORIZONTE
+from quantis import MEDIDAS_DIAS
+
+
+# Medições do rerun; só aparecem (e medem o JSON das figuras) no modo diagnóstico
+perfil = Perfil()
+
 
 st.set_page_config(
     page_title="Performance Logística",
@@ -22,14 +47,6 @@ WARNING      = "#D97706"
 NEUTRAL      = "#64748B"
 TEXT_DARK    = "#0F172A"
 
-HUB_COORDS = {
-    "São Paulo":      {"lat": -23.55, "lon": -46.63},
-    "Curitiba":       {"lat": -25.43, "lon": -49.27},
-    "Belo Horizonte": {"lat": -19.92, "lon": -43.93},
-    "Salvador":       {"lat": -12.97, "lon": -38.51},
-    "Recife":         {"lat":  -8.05, "lon": -34.88},
-}
-
 COLOR_TRANSPORT = {
     "Correios":   "#2563EB",
     "Jadlog":     "#7C3AED",
@@ -265,6 +282,11 @@ st.markdown("""
         color: #94A3B8;
         font-weight: 500;
     }
+    .kpi-ic {
+        font-size: 14px;
+        color: #94A3B8;
+        font-weight: 500;
+    }
 
     /* ── Header ── */
     .dash-header {
@@ -295,20 +317,38 @@ st.markdown("""
         margin-bottom: 20px;
     }
 
-    /* ── Tabs ── */
-    .stTabs [data-baseweb="tab-list"] {
+    /* ── Abas (seletor de painel) ── */
+    .st-key-aba div[role="radiogroup"] {
         gap: 4px;
         border-bottom: 2px solid #E2E8F0;
     }
-    .stTabs [data-baseweb="tab"] {
+    .st-key-aba div[role="radiogroup"] label {
         font-weight: 600;
         font-size: 13px;
         color: #64748B;
-        border-radius: 8px 8px 0 0;
         padding: 10px 20px;
+        margin: 0 0 -2px 0;
+        border-radius: 8px 8px 0 0;
+        border-bottom: 2px solid transparent;
+        cursor: pointer;
+    }
+    /* Marcador do rádio: BaseWeb no Streamlit 1.52, react-aria em versões posteriores */
+    .st-key-aba label[data-baseweb="radio"] > div:first-child,
+    .st-key-aba [data-testid="stRadioOption"] > div > div:first-child {
+        display: none;
+    }
+    .st-key-aba div[role="radiogroup"] label div,
+    .st-key-aba div[role="radiogroup"] label p {
+        font-weight: inherit;
+        font-size: inherit;
+        color: inherit;
     }
-    .stTabs [aria-selected="true"] {
-        color: #2563EB !important;
+    .st-key-aba div[role="radiogroup"] label:hover {
+        color: #1E293B;
+    }
+    .st-key-aba div[role="radiogroup"] label:has(input:checked) {
+        color: #2563EB;
+        border-bottom-color: #2563EB;
     }
 
     /* ── Seções & Insights ── */
@@ -365,36 +405,90 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-@st.cache_data
-def load_data():
-    """Carrega, valida e enriquece o dataset logístico."""
+@st.cache_resource(max_entries=4)
+def load_base(arquivos=None, assinatura=None):
+    """Dados, cubo e índice de filtragem (ou o motor SQL), compartilhados entre as sessões.
+
+    Com uma fonte particionada, `arquivos` são as partições do período pedido
+    e `assinatura` (só usada na chave do cache) o tamanho e o mtime de cada
+    uma: uma partição reescrita ou com linhas novas gera uma base nova.
+    """
     try:
-        df = pd.read_csv("FCD_logistica.csv", sep=";", encoding="utf-8")
+        if arquivos is not None:
+            return BaseDados(FONTE, arquivos=list(arquivos))
+        return BaseDados(FONTE) if MOTOR == "pandas" else MotorSQL(FONTE, MOTOR)
     except FileNotFoundError:
-        st.error("Arquivo **FCD_logistica.csv** não encontrado na raiz do projeto.")
+        st.error(f"Arquivo **{FONTE}** não encontrado na raiz do projeto.")
         st.stop()
     except Exception as exc:
         st.error(f"Erro ao carregar dados: {exc}")
         st.stop()
 
-    # Conversão de tipos
-    df["data_pedido"]  = pd.to_datetime(df["data_pedido"],  format="%d/%m/%Y", errors="coerce")
-    df["data_entrega"] = pd.to_datetime(df["data_entrega"], format="%d/%m/%Y", errors="coerce")
-    for col in ("prazo_estimado_dias", "prazo_real_dias", "custo_transporte"):
-        df[col] = pd.to_numeric(df[col], errors="coerce")
-
-    # Métricas derivadas
-    df["atraso_dias"] = df["prazo_real_dias"] - df["prazo_estimado_dias"]
-    df["no_prazo"]    = df["prazo_real_dias"] <= df["prazo_estimado_dias"]
-    df["atrasado"]    = df["prazo_real_dias"] >  df["prazo_estimado_dias"]
-    df["mes"]         = df["data_pedido"].dt.to_period("M").dt.to_timestamp()
 
-    # Limpeza
-    df = df.dropna(subset=["data_pedido", "prazo_real_dias", "custo_transporte"])
-    return df
+@st.cache_resource
+def load_particoes():
+    """Índice das partições mensais quando a fonte é um diretório."""
+    try:
+        return DatasetParticionado(FONTE)
+    except Exception as exc:
+        st.error(f"Erro ao indexar as partições de {FONTE}: {exc}")
+        st.stop()
 
 
-df_raw = load_data()
+@st.cache_resource
+def load_memo():
+    """Cache LRU de seleções, KPIs, tabelas e figuras das abas, por assinatura de filtros.
+
+    Limitado também pelo tamanho estimado das entradas (MAX_BYTES), já que
+    seleções e figuras variam muito de tamanho.
+    """
+    return CacheLRU(maxsize=256, maxbytes=MAX_BYTES)
+
+
+@st.cache_resource
+def load_precalculo(versao):
+    """Resultados do job de pré-cálculo; reavaliados a cada versão nova dos dados."""
+    return carregar_precalculo(FONTE)
+
+
+memo = load_memo()
+
+# Fonte em diretório: o período e as opções dos filtros vêm do índice de
+# partições e só as partições do período escolhido são carregadas (abaixo)
+particionado = MOTOR == "pandas" and os.path.isdir(FONTE)
+sql = False
+if particionado:
+    dataset = load_particoes()
+    dataset.indexar(INTERVALO_INDEXACAO)
+    opcoes = dataset
+    data_min, data_max = dataset.periodo()
+    registros = dataset.registros()
+else:
+    base = load_base()
+    perfil.marcar("Carga da base")
+
+    # Com o motor SQL não há cubo em memória: filtros e agregações viram consultas
+    sql = isinstance(base, MotorSQL)
+    if sql:
+        indice = base
+        data_min, data_max, registros = base.data_min, base.data_max, base.registros
+    else:
+        indice = base.indice
+        cubo   = indice.frame
+        data_min, data_max = cubo["data_pedido"].min(), cubo["data_pedido"].max()
+        registros = cubo["pedidos"].sum()
+    opcoes = indice
+
+
+@st.fragment(run_every="5s")
+def monitorar_fonte():
+    """Incorpora linhas anexadas à fonte e refaz a página quando houver novidades."""
+    if base.indice is not indice:
+        st.rerun()  # outra sessão já incorporou as linhas novas
+    novas = base.atualizar()
+    if novas:
+        st.toast(f"{fmt_num(novas)} novos registros incorporados")
+        st.rerun()
 
 
 with st.sidebar:
@@ -416,50 +510,300 @@ with st.sidebar:
         unsafe_allow_html=True,
     )
 
-    min_date = df_raw["data_pedido"].min().date()
-    max_date = df_raw["data_pedido"].max().date()
+    min_date = data_min.date()
+    max_date = data_max.date()
     cd1, cd2 = st.columns(2)
     with cd1:
         data_inicio = st.date_input("De", value=min_date, min_value=min_date, max_value=max_date)
     with cd2:
         data_fim = st.date_input("Até", value=max_date, min_value=min_date, max_value=max_date)
 
-    transportadoras = sorted(df_raw["transportadora"].dropna().unique())
+    transportadoras = opcoes.valores("transportadora")
     sel_transp = st.multiselect("Transportadora", transportadoras, default=transportadoras)
 
-    hubs = sorted(df_raw["cidade_origem"].dropna().unique())
+    hubs = opcoes.valores("cidade_origem")
     sel_hubs = st.multiselect("Hub de Origem", hubs, default=hubs)
 
-    statuses = sorted(df_raw["status_entrega"].dropna().unique())
+    statuses = opcoes.valores("status_entrega")
     sel_status = st.multiselect("Status", statuses, default=statuses)
 
     st.markdown("---")
     st.markdown(
         f'<div style="font-size:11px;color:#475569;text-align:center;">'
-        f'Base: {fmt_num(len(df_raw))} registros</div>',
+        f'Base: {fmt_num(registros)} registros</div>',
         unsafe_allow_html=True,
     )
+    ao_vivo = not sql and st.toggle("Atualização ao vivo", value=False, help="Verifica a cada 5 s se há linhas novas na fonte")
+    aproximado = not sql and st.toggle(
+        "Modo aproximado", value=False,
+        help="KPIs e gráficos de OTD e custo a partir de uma amostra estratificada "
+             "(transportadora × hub × mês), com intervalos de confiança de 95%; "
+             "a página é refinada em seguida até os valores exatos",
+    )
+    perfil.ativo = st.toggle(
+        "Diagnóstico de desempenho", value=st.query_params.get("perfil") == "1",
+        help="Mostra, ao fim da página, o tempo, as linhas, o uso do cache e o tamanho "
+             "das figuras de cada seção (também com ?perfil=1 na URL)",
+    )
+perfil.marcar("Barra lateral")
+
+if particionado:
+    arquivos = dataset.arquivos(data_inicio, data_fim)
+    if not arquivos:
+        st.warning("Nenhuma partição cobre o período selecionado. Ajuste as datas na barra lateral.")
+        st.stop()
+    # Ao vivo, a própria base incorpora as anexações (monitorar_fonte); sem
+    # a assinatura na chave, elas não forçam uma recarga completa
+    base   = load_base(tuple(arquivos), None if ao_vivo else dataset.assinatura(arquivos))
+    indice = base.indice
+    perfil.marcar(f"Carga das partições ({len(arquivos)})", linhas=len(base.frame))
+
+if ao_vivo:
+    with st.sidebar:
+        monitorar_fonte()
+
+filtros_sel = dict(transportadora=sel_transp, cidade_origem=sel_hubs, status_entrega=sel_status)
+assinatura  = indice.assinatura(data_inicio, data_fim, **filtros_sel)
+
+
+@st.fragment
+def exportar_selecao():
+    """Exporta em blocos, com progresso, os pedidos da seleção da barra lateral."""
+    with st.expander("Exportar pedidos filtrados"):
+        formato = st.radio(
+            "Formato", formatos(), format_func=str.upper, horizontal=True, key="exportar_formato",
+            help="CSV no layout da fonte (separador ;) ou Parquet (tipado e compacto)",
+        )
+        chave = (assinatura, formato)
+        if st.button("Gerar arquivo", key="exportar_gerar", width='stretch'):
+            pasta = os.path.join(CACHE_DIR, "exportacoes")
+            os.makedirs(pasta, exist_ok=True)
+            resumo = hashlib.sha1(repr(chave).encode()).hexdigest()[:12]
+            caminho = os.path.join(pasta, f"pedidos_{resumo}{EXTENSOES[formato]}")
+            barra = st.progress(0.0, text="Exportando…")
+            mascara = base.explorador.mascara(data_inicio, data_fim, **filtros_sel)
+            linhas = exportar(
+                base.frame, mascara, caminho, formato,
+                progresso=lambda f: barra.progress(f, text=f"Exportando… {f:.0%}"),
+            )
+            barra.empty()
+            st.session_state["exportacao"] = (chave, caminho, linhas)
+            # Exportações antigas (de qualquer sessão) saem da pasta; a recém-gerada fica
+            limpar_exportacoes(pasta, manter=[caminho])
+
+        exportado = st.session_state.get("exportacao")
+        if exportado and exportado[0] == chave and os.path.exists(exportado[1]):
+            _, caminho, linhas = exportado
+
+            # O arquivo só é lido quando o download é pedido, fora do rerun
+            # (`data` como função: Streamlit 1.52+, ver requirements.txt)
+            def _conteudo():
+                with open(caminho, "rb") as f:
+                    return f.read()
+
+            st.download_button(
+                "Baixar", _conteudo,
+                file_name=f"pedidos_{data_inicio:%Y%m%d}_{data_fim:%Y%m%d}{EXTENSOES[formato]}",
+                mime="text/csv" if formato == "csv" else "application/octet-stream",
+                key="exportar_baixar", width='stretch',
+            )
+            st.caption(
+                f"{fmt_num(linhas)} pedidos · {os.path.getsize(caminho) / 2 ** 20:.1f} MB "
+                f"em {caminho}"
+            )
+
+
+if not sql:
+    with st.sidebar:
+        exportar_selecao()
+
+# Seleções comuns (padrão, um hub, uma transportadora) podem vir prontas do
+# job precalculo.py, enquanto o CSV for o mesmo usado no pré-cálculo
+precalculado = load_precalculo(indice.versao).get(chave_selecao(data_inicio, data_fim, assinatura[2]), {})
+
+
+def memo_sel(nome, calcular):
+    """Resultado `nome` da seleção atual, memoizado pela assinatura dos filtros."""
+    chave = (nome, assinatura)
+    perfil.cache(chave in memo or nome in precalculado)
+    if nome in precalculado:
+        return precalculado[nome]
+    return memo.obter(chave, calcular)
+
+
+def figura(id_grafico, construir, *entradas):
+    """Figura memoizada por gráfico, assinatura dos filtros e demais entradas.
+
+    Num rerun sem mudança nas entradas a figura não é reconstruída (montagem
+    e validação do Plotly são caras): custa só a consulta ao cache LRU.
+    """
+    return memo_sel(("figura", id_grafico, *entradas), construir)
+
+
+# Modo aproximado: o primeiro rerun após uma mudança de filtro usa o menor
+# nível da amostra; cada rerun seguinte refina um nível, até o exato (None)
+nivel = None
+if aproximado:
+    amostra = base.amostra
+    perfil.marcar("Amostra estratificada", linhas=len(amostra))
+    refino = st.session_state.get("refino")
+    nivel = refino[1] if refino and refino[0] == assinatura else 0
+    if nivel < len(amostra.niveis):
+        amostra_sel = memo_sel(
+            ("selecao", "amostra", nivel),
+            lambda: amostra.selecionar(nivel, data_inicio, data_fim, **filtros_sel),
+        )
+        if amostra_sel.empty:
+            nivel = None  # seleção pequena demais para a amostra: vai direto ao exato
+    else:
+        nivel = None
+
+
+def plotar(fig, secao, linhas=None):
+    """Envia a figura com o tema do dashboard e fecha a seção correspondente do perfil."""
+    t0 = time.perf_counter()
+    st.plotly_chart(fig, width='stretch', theme=None)
+    perfil.marcar(secao, linhas, figura=fig, envio=time.perf_counter() - t0)
+
+
+def rotas():
+    """Tabela de rotas da seleção, do cubo mensal de rotas (fora do modo SQL)."""
+    return memo_sel("rotas", lambda: base.rotas.resumir(data_inicio, data_fim, **filtros_sel))
+
+
+if sql:
+    kpi = memo_sel("kpis", lambda: base.kpis(data_inicio, data_fim, **filtros_sel))
+
+    def agregados():
+        """Agregados de todas as abas, um GROUP BY por conjunto de chaves no motor SQL."""
+        return memo_sel("agregados", lambda: base.resumir_varios(CHAVES_ABAS, data_inicio, data_fim, **filtros_sel))
+elif nivel is not None:
+    perfil.marcar("Seleção (amostra)", linhas=len(amostra_sel))
+    kpi = memo_sel(("kpis", "amostra", nivel), lambda: amostra.kpis(amostra_sel, nivel))
+
+    def agregados():
+        """Agregados exatos das abas que não são estimadas (Mapa e Decisões)."""
+        cubo_sel = memo_sel("selecao", lambda: indice.filtrar(data_inicio, data_fim, **filtros_sel))
+        return {**memo_sel("agregados", lambda: resumir_varios(cubo_sel, CHAVES_CUBO)), CHAVES_ROTAS: rotas()}
+else:
+    cubo_sel = memo_sel("selecao", lambda: indice.filtrar(data_inicio, data_fim, **filtros_sel))
+    perfil.marcar("Seleção (filtro)", linhas=len(cubo_sel))
+    kpi = None if cubo_sel.empty else memo_sel("kpis", lambda: kpis(cubo_sel, rotas()))
+
+    def agregados():
+        """Agregados de todas as abas: uma passada sobre a seleção do cubo, mais as rotas."""
+        return {**memo_sel("agregados", lambda: resumir_varios(cubo_sel, CHAVES_CUBO)), CHAVES_ROTAS: rotas()}
+
+
+def tabelas_estimaveis(nome, montar):
+    """Tabelas das abas de OTD e custo: exatas ou estimadas pela amostra do nível."""
+    if nivel is None:
+        return memo_sel(nome, lambda: montar(agregados()))
+    return memo_sel(
+        (nome, "amostra", nivel),
+        lambda: montar(amostra.resumir(amostra_sel, nivel, CHAVES_AMOSTRA)),
+    )
+
+
+def ic(df, chaves, metrica, escala=1):
+    """Meia-largura do IC 95% de `metrica` para cada linha de `df` (None se exato)."""
+    if nivel is None:
+        return None
+    tabela = memo_sel(
+        ("ic", chaves, nivel), lambda: amostra.intervalos(amostra_sel, nivel, chaves),
+    )
+    faixa = df[list(chaves)].merge(tabela, on=list(chaves), how="left")[f"ic_{metrica}"]
+    return faixa.to_numpy() * escala
+
+
+def projecao(chaves=("transportadora",)):
+    """Projeção dos próximos meses, com faixa de 95%, para os hubs e status selecionados.
+
+    Ajustada uma vez por versão dos dados (`base.previsoes`). None no motor
+    SQL, quando o período não chega ao último mês da base (de onde a projeção
+    continua as séries), quando só parte das partições está carregada (o
+    histórico estaria truncado) ou quando não há projeção para a seleção.
+    """
+    if sql:
+        return None
+    if particionado and len(arquivos) < len(dataset.arquivos(data_min, data_max)):
+        return None
+    previsoes = base.previsoes
+    if previsoes.ultimo_mes is None or data_fim < previsoes.ultimo_mes.date():
+        return None
+    proj = memo_sel(("projecao", chaves), lambda: previsoes.agregar(chaves, **filtros_sel))
+    return None if proj.empty else proj
+
+
+def _rgba(cor, alfa):
+    r, g, b = (int(cor[i:i + 2], 16) for i in (1, 3, 5))
+    return f"rgba({r},{g},{b},{alfa})"
+
+
+def tracos_projecao(real, y, proj, valor, formato, prefixo="", sufixo="", **extra):
+    """Linha pontilhada e faixa de 95% da projeção de cada transportadora.
+
+    As duas partem do último mês observado em `real` (coluna `y`) para
+    continuar a série; `extra` vai para a linha (p.ex. stackgroup).
+    """
+    tracos = []
+    for transp, d in proj.groupby("transportadora", observed=True):
+        cor = COLOR_TRANSPORT.get(transp, ACCENT)
+        ultimo = real[real["transportadora"] == transp].nlargest(1, "mes")
+        x = [*ultimo["mes"], *d["mes"]]
+        centro = [*ultimo[y], *d[valor]]
+        inf, sup = [*ultimo[y], *d[f"{valor}_inf"]], [*ultimo[y], *d[f"{valor}_sup"]]
+        if "stackgroup" in extra:
+            extra["fillcolor"] = _rgba(cor, 0.25)
+        else:
+            tracos.append(go.Scatter(
+                x=x + x[::-1], y=sup + inf[::-1], fill="toself", fillcolor=_rgba(cor, 0.15),
+                line_width=0, hoverinfo="skip", showlegend=False, legendgroup=transp,
+            ))
+        tracos.append(go.Scatter(
+            x=x, y=centro, mode="lines", name=f"{transp} (projeção)", legendgroup=transp,
+            showlegend=False, line=dict(color=cor, dash="dot", width=2),
+            customdata=list(zip(inf, sup)),
+            hovertemplate=(
+                f"{transp} (projeção): {prefixo}%{{y:{formato}}}{sufixo} "
+                f"({prefixo}%{{customdata[0]:{formato}}} – {prefixo}%{{customdata[1]:{formato}}}{sufixo})"
+                "<extra></extra>"
+            ),
+            **extra,
+        ))
+    return tracos
+
+
+def percentis(chaves=()):
+    """Percentis (p50/p90/p99) de prazo real e atraso da seleção, por grupo de `chaves`.
+
+    Sempre exatos: somas dos histogramas de prazos da base, não das linhas.
+    """
+    sel = memo_sel("selecao_quantis", lambda: base.quantis.selecionar(data_inicio, data_fim, **filtros_sel))
+    return memo_sel(
+        ("percentis", chaves),
+        lambda: {m: base.quantis.percentis(sel, m, chaves) for m in MEDIDAS_DIAS},
+    )
 
-df = df_raw.copy()
-df = df[
-    (df["data_pedido"].dt.date >= data_inicio)
-    & (df["data_pedido"].dt.date <= data_fim)
-    & (df["transportadora"].isin(sel_transp))
-    & (df["cidade_origem"].isin(sel_hubs))
-    & (df["status_entrega"].isin(sel_status))
-]
 
-if df.empty:
+def mais_menos(chave, formato):
+    """Sufixo "± meia-largura" de um KPI estimado."""
+    if "ic" not in kpi:
+        return ""
+    return f'<span class="kpi-ic"> ± {formato(kpi["ic"][chave])}</span>'
+
+perfil.marcar("KPIs")
+
+if kpi is None:
     st.warning("Nenhum registro encontrado com os filtros selecionados. Ajuste os filtros na barra lateral.")
     st.stop()
-
-total_pedidos = len(df)
-custo_total   = df["custo_transporte"].sum()
-custo_medio   = df["custo_transporte"].mean()
-otd_pct       = df["no_prazo"].mean() * 100
-tempo_medio   = df["prazo_real_dias"].mean()
-atraso_medio  = df.loc[df["atrasado"], "atraso_dias"].mean() if df["atrasado"].any() else 0
-pct_atrasados = df["atrasado"].mean() * 100
+total_pedidos = kpi["total_pedidos"]
+custo_total   = kpi["custo_total"]
+custo_medio   = kpi["custo_medio"]
+otd_pct       = kpi["otd_pct"]
+tempo_medio   = kpi["tempo_medio"]
+atraso_medio  = kpi["atraso_medio"]
+pct_atrasados = kpi["pct_atrasados"]
 
 
 st.markdown(
@@ -480,8 +824,8 @@ with k1:
     st.markdown(
         kpi_card(
             "check-circle", "Entregas no Prazo (OTD)",
-            f"{otd_pct:.1f}%".replace(".", ","),
-            f"{fmt_num(df['no_prazo'].sum())} de {fmt_num(total_pedidos)} pedidos",
+            f"{otd_pct:.1f}%".replace(".", ",") + mais_menos("otd_pct", lambda v: f"{v:.1f}".replace(".", ",") + " p.p."),
+            f"{fmt_num(kpi['no_prazo'])} de {fmt_num(total_pedidos)} pedidos",
             _c,
         ),
         unsafe_allow_html=True,
@@ -501,8 +845,8 @@ with k2:
     st.markdown(
         kpi_card(
             "dollar-sign", "Custo Total de Frete",
-            fmt_brl(custo_total, 0),
-            f"Médio: {fmt_brl(custo_medio)} / pedido",
+            fmt_brl(custo_total, 0) + mais_menos("custo_total", lambda v: fmt_brl(v, 0)),
+            f"Médio: {fmt_brl(custo_medio)} / pedido" + mais_menos("custo_medio", fmt_brl),
             ACCENT,
         ),
         unsafe_allow_html=True,
@@ -512,8 +856,8 @@ with k3:
     st.markdown(
         kpi_card(
             "package", "Volume de Pedidos",
-            fmt_num(total_pedidos),
-            f"{fmt_num(df['cidade_destino'].nunique())} destinos únicos",
+            fmt_num(total_pedidos) + mais_menos("total_pedidos", fmt_num),
+            f"{fmt_num(kpi['destinos'])} destinos únicos" + (" na amostra" if "ic" in kpi else ""),
             ACCENT,
         ),
         unsafe_allow_html=True,
@@ -523,8 +867,8 @@ with k4:
     st.markdown(
         kpi_card(
             "clock", "Tempo Médio de Entrega",
-            f"{tempo_medio:.1f} dias".replace(".", ","),
-            f"Prazo estimado médio: {df['prazo_estimado_dias'].mean():.1f} dias".replace(".", ","),
+            f"{tempo_medio:.1f} dias".replace(".", ",") + mais_menos("tempo_medio", lambda v: f"{v:.2f}".replace(".", ",")),
+            f"Prazo estimado médio: {kpi['prazo_estimado']:.1f} dias".replace(".", ","),
             WARNING,
         ),
         unsafe_allow_html=True,
@@ -535,8 +879,9 @@ with k5:
     st.markdown(
         kpi_card(
             "alert-triangle", "Taxa de Atraso",
-            f"{pct_atrasados:.1f}%".replace(".", ","),
-            f"Atraso médio: {atraso_medio:.1f} dias (quando atrasa)".replace(".", ","),
+            f"{pct_atrasados:.1f}%".replace(".", ",") + mais_menos("pct_atrasados", lambda v: f"{v:.1f}".replace(".", ",") + " p.p."),
+            f"Atraso médio: {atraso_medio:.1f} dias (quando atrasa)".replace(".", ",")
+            + mais_menos("atraso_medio", lambda v: f"{v:.2f}".replace(".", ",")),
             _c,
         ),
         unsafe_allow_html=True,
@@ -552,100 +897,125 @@ with k5:
         unsafe_allow_html=True,
     )
 
+# Percentis de prazo (SLA): cartões da seleção inteira
+if not sql:
+    pct = percentis()
+    prazo, atraso = pct["prazo_real_dias"].iloc[0], pct["atraso_dias"].iloc[0]
+    for coluna, p, legenda in zip(
+        st.columns(3), ("p50", "p90", "p99"),
+        ("metade dos pedidos", "90% dos pedidos", "99% dos pedidos"),
+    ):
+        with coluna:
+            st.markdown(
+                kpi_card(
+                    "clock", f"Prazo de Entrega {p.upper()}",
+                    f"{prazo[p]:.0f} dias",
+                    f"{legenda} em até {prazo[p]:.0f} dias · atraso {p.upper()}: {atraso[p]:.0f} dias",
+                    ACCENT,
+                ),
+                unsafe_allow_html=True,
+            )
+    perfil.marcar("Cards de percentis")
+
+if aproximado:
+    if nivel is None:
+        st.caption("Modo aproximado: valores exatos.")
+    else:
+        st.caption(
+            f"Modo aproximado: estimativas de uma amostra estratificada de {fmt_num(len(amostra_sel))} "
+            f"pedidos (até {fmt_num(amostra.niveis[nivel])} por transportadora × hub × mês), com "
+            f"intervalos de confiança de 95% nos KPIs e nos gráficos de OTD e custo. Refinando…"
+        )
 st.markdown("<div style='height:12px'></div>", unsafe_allow_html=True)
+perfil.marcar("Cards de KPI")
 
 
-tab_perf, tab_mapa, tab_custo, tab_decisao = st.tabs([
-    "  Performance  ",
-    "  Mapa & Fluxos  ",
-    "  Análise de Custos  ",
-    "  Decisões para Gestão  ",
-])
-
-with tab_perf:
+def render_performance():
+    """Aba Performance."""
+    t_perf = tabelas_estimaveis("performance", tabelas_performance)
     col_a, col_b = st.columns(2)
 
     with col_a:
-        df_tempo = (
-            df.groupby("transportadora")["prazo_real_dias"]
-            .mean().reset_index()
-            .sort_values("prazo_real_dias", ascending=True)
-        )
-        fig = px.bar(
-            df_tempo, x="prazo_real_dias", y="transportadora",
-            orientation="h",
-            text=df_tempo["prazo_real_dias"].apply(lambda v: f"{v:.1f} dias".replace(".", ",")),
-            color="transportadora", color_discrete_map=COLOR_TRANSPORT,
-        )
-        fig.update_traces(textposition="outside", textfont_size=12)
-        fig.update_layout(
-            **CHART_LAYOUT,
-            title="Tempo Médio de Entrega por Transportadora",
-            xaxis_title="Dias", yaxis_title="",
-            showlegend=False, height=350,
-        )
-        _apply_axis_style(fig)
-        st.plotly_chart(fig, width='stretch', theme=None)
+        df_tempo = t_perf["tempo"]
+
+        def _fig_perf_tempo():
+            fig = px.bar(
+                df_tempo, x="prazo_real_dias", y="transportadora",
+                orientation="h",
+                text=df_tempo["prazo_real_dias"].apply(lambda v: f"{v:.1f} dias".replace(".", ",")),
+                color="transportadora", color_discrete_map=COLOR_TRANSPORT,
+                error_x=ic(df_tempo, ("transportadora",), "tempo_medio"),
+            )
+            fig.update_traces(textposition="outside", textfont_size=12)
+            fig.update_layout(
+                **CHART_LAYOUT,
+                title="Tempo Médio de Entrega por Transportadora",
+                xaxis_title="Dias", yaxis_title="",
+                showlegend=False, height=350,
+            )
+            _apply_axis_style(fig)
+            return fig
+
+        plotar(figura("perf_tempo", _fig_perf_tempo, nivel), "Performance · tempo médio", len(df_tempo))
 
     with col_b:
-        df_otd = (
-            df.groupby("transportadora")["no_prazo"]
-            .mean().mul(100).reset_index()
-            .rename(columns={"no_prazo": "otd"})
-            .sort_values("otd", ascending=True)
-        )
-        fig = px.bar(
-            df_otd, x="otd", y="transportadora",
-            orientation="h",
-            text=df_otd["otd"].apply(lambda v: f"{v:.1f}%".replace(".", ",")),
-            color="transportadora", color_discrete_map=COLOR_TRANSPORT,
+        df_otd = t_perf["otd"]
+
+        def _fig_perf_otd():
+            fig = px.bar(
+                df_otd, x="otd", y="transportadora",
+                orientation="h",
+                text=df_otd["otd"].apply(lambda v: f"{v:.1f}%".replace(".", ",")),
+                color="transportadora", color_discrete_map=COLOR_TRANSPORT,
+                error_x=ic(df_otd, ("transportadora",), "otd", 100),
+            )
+            fig.update_traces(textposition="outside", textfont_size=12)
+            fig.update_layout(
+                **CHART_LAYOUT,
+                title="Taxa de Entrega no Prazo (OTD) por Transportadora<br><sub style='font-size:11px;color:#94A3B8;font-weight:400;'>OTD = On-Time Delivery (% de pedidos entregues no prazo ou antes)</sub>",
+                xaxis_title="OTD (%)", yaxis_title="",
+                showlegend=False, height=350,
+            )
+            fig.update_xaxes(range=[0, max(df_otd["otd"].max() * 1.15, 100)])
+            _apply_axis_style(fig)
+            return fig
+
+        plotar(figura("perf_otd", _fig_perf_otd, nivel), "Performance · OTD por transportadora", len(df_otd))
+
+    # ── Evolução Mensal do OTD ──
+    st.markdown(section_title("trending-up", "Evolução Mensal do OTD (% de pedidos entregues no prazo)"), unsafe_allow_html=True)
+
+    df_trend = t_perf["trend"]
+    proj = projecao()
+
+    def _fig_perf_trend():
+        fig = px.line(
+            df_trend, x="mes", y="otd", color="transportadora",
+            color_discrete_map=COLOR_TRANSPORT, markers=True,
+            error_y=ic(df_trend, ("mes", "transportadora"), "otd", 100),
         )
-        fig.update_traces(textposition="outside", textfont_size=12)
+        if proj is not None:
+            fig.add_traces(tracos_projecao(df_trend, "otd", proj, "otd", ".1f", sufixo="%"))
         fig.update_layout(
             **CHART_LAYOUT,
-            title="Taxa de Entrega no Prazo (OTD) por Transportadora<br><sub style='font-size:11px;color:#94A3B8;font-weight:400;'>OTD = On-Time Delivery (% de pedidos entregues no prazo ou antes)</sub>",
-            xaxis_title="OTD (%)", yaxis_title="",
-            showlegend=False, height=350,
+            title="Evolução da Taxa OTD ao Longo do Tempo",
+            xaxis_title="", yaxis_title="OTD (%)", height=360,
+            legend_title="Transportadora", hovermode="x unified",
         )
-        fig.update_xaxes(range=[0, max(df_otd["otd"].max() * 1.15, 100)])
+        fig.update_traces(line_width=2.5)
         _apply_axis_style(fig)
-        st.plotly_chart(fig, width='stretch', theme=None)
-
-    # ── Evolução Mensal do OTD ──
-    st.markdown(section_title("trending-up", "Evolução Mensal do OTD (% de pedidos entregues no prazo)"), unsafe_allow_html=True)
+        return fig
 
-    df_trend = (
-        df.groupby([df["mes"], "transportadora"])["no_prazo"]
-        .mean().mul(100).reset_index()
-        .rename(columns={"no_prazo": "otd"})
-    )
-    fig = px.line(
-        df_trend, x="mes", y="otd", color="transportadora",
-        color_discrete_map=COLOR_TRANSPORT, markers=True,
-    )
-    fig.update_layout(
-        **CHART_LAYOUT,
-        title="Evolução da Taxa OTD ao Longo do Tempo",
-        xaxis_title="", yaxis_title="OTD (%)", height=360,
-        legend_title="Transportadora", hovermode="x unified",
-    )
-    fig.update_traces(line_width=2.5)
-    _apply_axis_style(fig)
-    st.plotly_chart(fig, width='stretch', theme=None)
+    plotar(figura("perf_trend", _fig_perf_trend, nivel), "Performance · evolução do OTD", len(df_trend))
+    if proj is not None:
+        st.caption(
+            f"Pontilhado: projeção dos próximos {HORIZONTE} meses (Holt-Winters por "
+            "transportadora × hub × status), com faixa de 95%."
+        )
 
     st.markdown(section_title("map-pin", "Performance por Hub de Origem"), unsafe_allow_html=True)
 
-    df_hub = (
-        df.groupby("cidade_origem")
-        .agg(
-            volume=("pedido_id", "count"),
-            otd=("no_prazo", "mean"),
-            tempo=("prazo_real_dias", "mean"),
-            custo=("custo_transporte", "mean"),
-        )
-        .reset_index()
-        .sort_values("volume", ascending=False)
-    )
+    df_hub = t_perf["hub"]
 
     hub_cols = st.columns(len(df_hub))
     for i, (_, r) in enumerate(df_hub.iterrows()):
@@ -667,99 +1037,73 @@ with tab_perf:
                 </div>""",
                 unsafe_allow_html=True,
             )
+    perfil.marcar("Performance · cards dos hubs", len(df_hub))
+
+    if sql:
+        return
+    st.markdown(section_title("target", "Percentis de Prazo (SLA)"), unsafe_allow_html=True)
+    medida = st.radio(
+        "Medida", ["prazo_real_dias", "atraso_dias"], horizontal=True, key="medida_percentis",
+        format_func={"prazo_real_dias": "Prazo real", "atraso_dias": "Atraso"}.get,
+    )
+    nome_medida = "Prazo real" if medida == "prazo_real_dias" else "Atraso"
+    col_p, col_h = st.columns(2)
 
+    with col_p:
+        df_pct = percentis(("transportadora",))[medida]
 
-with tab_mapa:
-
-    # ── Função auxiliar: gerar coordenada determinística para cidade fictícia ──
-    # Fronteira LESTE (costa) e OESTE (divisa) simplificadas (lat → lon)
-    _COAST_EAST = [
-        (-33.0, -52.5), (-30.0, -50.2), (-28.0, -48.6), (-26.0, -48.5),
-        (-25.3, -48.3), (-24.0, -46.3), (-23.0, -43.5), (-22.0, -41.0),
-        (-20.0, -40.0), (-18.0, -39.5), (-16.0, -39.0), (-14.0, -38.9),
-        (-13.0, -38.5), (-10.0, -36.5), (-8.0,  -34.9), (-5.0,  -35.2),
-        (-3.0,  -38.5), (-1.0,  -44.0), (0.0,   -48.0), (2.0,   -50.0),
-        (4.5,   -51.5),
-    ]
-    _BORDER_WEST = [
-        (-33.0, -57.5), (-30.0, -57.0), (-28.0, -56.0), (-26.0, -54.5),
-        (-24.0, -54.5), (-22.0, -55.0), (-20.0, -57.5), (-18.0, -58.0),
-        (-16.0, -59.0), (-14.0, -60.0), (-12.0, -62.0), (-10.0, -65.5),
-        (-8.0,  -67.0), (-6.0,  -69.5), (-4.0,  -70.0), (-2.0,  -70.0),
-        (0.0,   -69.5), (2.0,   -64.0), (4.5,   -60.5),
-    ]
-
-    def _interp_border(lat, border_pts):
-        """Interpola longitude de uma fronteira para dada latitude."""
-        lats = [p[0] for p in border_pts]
-        lons = [p[1] for p in border_pts]
-        if lat <= lats[0]:
-            return lons[0]
-        if lat >= lats[-1]:
-            return lons[-1]
-        for i in range(len(lats) - 1):
-            if lats[i] <= lat <= lats[i + 1]:
-                t = (lat - lats[i]) / (lats[i + 1] - lats[i])
-                return lons[i] + t * (lons[i + 1] - lons[i])
-        return -47.0
-
-    @st.cache_data
-    def _dest_coords(cidade_destino, cidade_origem):
-        """Gera lat/lon simulada para destino, dentro do território brasileiro."""
-        hub = HUB_COORDS.get(cidade_origem, {"lat": -15.0, "lon": -47.0})
-
-        # Hash determinístico
-        h = int(hashlib.md5(cidade_destino.encode()).hexdigest(), 16)
-        h2 = int(hashlib.md5((cidade_destino + "_v2").encode()).hexdigest(), 16)
-
-        # Espalhar: lat ±5 graus, lon até -10 graus para oeste
-        lat_offset = ((h % 1000) / 1000 - 0.5) * 10.0       # -5 a +5 graus
-        lon_offset = -((h2 % 10000) / 10000 * 9.0 + 1.0)    # -1 a -10 graus (sempre oeste)
-
-        lat = hub["lat"] + lat_offset
-        lon = hub["lon"] + lon_offset
-
-       
-        lat = np.clip(lat, -32.5, 4.0)
-
-        
-        east_lon = _interp_border(lat, _COAST_EAST)
-        west_lon = _interp_border(lat, _BORDER_WEST)
-
-        east_limit = east_lon - 0.8
-        west_limit = west_lon + 0.8
-
-        if lon > east_limit:
-            frac = (h % 5000) / 5000
-            lon = west_limit + frac * (east_limit - west_limit)
-        elif lon < west_limit:
-            frac = (h2 % 5000) / 5000
-            lon = west_limit + frac * (east_limit - west_limit)
-
-        return lat, lon
+        def _fig_perf_percentis():
+            longo = df_pct.melt(
+                id_vars="transportadora", value_vars=["p50", "p90", "p99"],
+                var_name="percentil", value_name="dias",
+            )
+            fig = px.bar(
+                longo, x="transportadora", y="dias", color="percentil", barmode="group",
+                text="dias", color_discrete_sequence=[ACCENT_LIGHT, ACCENT, ACCENT_DARK],
+            )
+            fig.update_traces(textposition="outside", textfont_size=12)
+            fig.update_layout(
+                **CHART_LAYOUT,
+                title=f"{nome_medida} (dias): P50, P90 e P99 por Transportadora",
+                xaxis_title="", yaxis_title="Dias", height=380, legend_title="Percentil",
+            )
+            _apply_axis_style(fig)
+            return fig
 
-    st.markdown(section_title("map-pin", "Mapa Interativo — Fluxos Origem → Destino"), unsafe_allow_html=True)
+        plotar(figura("perf_percentis", _fig_perf_percentis, medida), "Performance · percentis por transportadora", len(df_pct))
 
-    df_routes = (
-        df.groupby(["cidade_origem", "cidade_destino"])
-        .agg(
-            volume=("pedido_id", "count"),
-            atraso_medio=("atraso_dias", "mean"),
-            atrasado_pct=("atrasado", "mean"),
-            custo_total=("custo_transporte", "sum"),
+    with col_h:
+        df_p90 = (
+            percentis(("cidade_origem", "transportadora"))[medida]
+            .pivot(index="cidade_origem", columns="transportadora", values="p90")
         )
-        .reset_index()
-    )
-    avg_atraso_global = df_routes["atraso_medio"].mean()
 
-    dest_coords = df_routes.apply(
-        lambda r: _dest_coords(r["cidade_destino"], r["cidade_origem"]), axis=1
-    )
-    df_routes["dest_lat"] = [c[0] for c in dest_coords]
-    df_routes["dest_lon"] = [c[1] for c in dest_coords]
-    df_routes["orig_lat"] = df_routes["cidade_origem"].map(lambda x: HUB_COORDS[x]["lat"])
-    df_routes["orig_lon"] = df_routes["cidade_origem"].map(lambda x: HUB_COORDS[x]["lon"])
-    df_routes["is_delayed"] = df_routes["atraso_medio"] > avg_atraso_global
+        def _fig_perf_p90():
+            fig = px.imshow(
+                df_p90, text_auto=True,
+                color_continuous_scale=["#DBEAFE", "#2563EB", "#DC2626"],
+                aspect="auto",
+            )
+            fig.update_layout(
+                **CHART_LAYOUT,
+                title=f"{nome_medida} P90 (dias): Hub × Transportadora",
+                xaxis_title="Transportadora", yaxis_title="Hub de Origem",
+                height=380, coloraxis_colorbar_title="Dias",
+            )
+            _apply_axis_style(fig)
+            return fig
+
+        plotar(figura("perf_p90", _fig_perf_p90, medida), "Performance · P90 por hub e transportadora", df_p90.size)
+
+
+def render_mapa():
+    """Aba Mapa & Fluxos."""
+
+    st.markdown(section_title("map-pin", "Mapa Interativo — Fluxos Origem → Destino"), unsafe_allow_html=True)
+
+    t_mapa = memo_sel("mapa", lambda: com_coordenadas(tabelas_mapa(agregados())))
+    df_routes = t_mapa["routes"]
+    avg_atraso_global = t_mapa["avg_atraso_global"]
 
     total_routes = len(df_routes)
     top_n = st.slider(
@@ -767,98 +1111,56 @@ with tab_mapa:
         value=max(10, total_routes // 2), step=10,
         help=f"Total de rotas: {total_routes}. Exibe as top N por volume. Arraste até o fim para ver todas.",
     )
+    render_compacto = st.toggle(
+        "Renderização compacta das rotas", value=True,
+        help="Agrupa as rotas em poucos traços por faixa de espessura. "
+             "Desative para desenhar um traço por rota.",
+    )
     df_top = df_routes.nlargest(top_n, "volume")
 
-    fig = go.Figure()
-
-    df_ok = df_top[~df_top["is_delayed"]]
-    for _, r in df_ok.iterrows():
-        fig.add_trace(go.Scattergeo(
-            lat=[r["orig_lat"], r["dest_lat"]],
-            lon=[r["orig_lon"], r["dest_lon"]],
-            mode="lines",
-            line=dict(width=max(0.5, r["volume"] / df_top["volume"].max() * 3), color="rgba(37,99,235,0.3)"),
-            hoverinfo="text",
-            text=f"<b>{r['cidade_origem']} → {r['cidade_destino']}</b><br>"
-                 f"Volume: {r['volume']}<br>"
-                 f"Atraso médio: {r['atraso_medio']:.1f} dias<br>"
-                 f"Custo total: {fmt_brl(r['custo_total'], 0)}",
-            showlegend=False,
-        ))
-
-    df_delay = df_top[df_top["is_delayed"]]
-    for _, r in df_delay.iterrows():
-        fig.add_trace(go.Scattergeo(
-            lat=[r["orig_lat"], r["dest_lat"]],
-            lon=[r["orig_lon"], r["dest_lon"]],
-            mode="lines",
-            line=dict(width=max(0.8, r["volume"] / df_top["volume"].max() * 3.5), color="rgba(220,38,38,0.4)"),
-            hoverinfo="text",
-            text=f"<b>{r['cidade_origem']} → {r['cidade_destino']}</b><br>"
-                 f"Volume: {r['volume']}<br>"
-                 f"Atraso médio: {r['atraso_medio']:.1f} dias ⚠<br>"
-                 f"Custo total: {fmt_brl(r['custo_total'], 0)}",
-            showlegend=False,
-        ))
-
-    fig.add_trace(go.Scattergeo(
-        lat=df_top["dest_lat"], lon=df_top["dest_lon"],
-        mode="markers",
-        marker=dict(
-            size=4, color=df_top["is_delayed"].map({True: DANGER, False: "#93C5FD"}),
-            opacity=0.6, line=dict(width=0),
-        ),
-        hoverinfo="skip", showlegend=False,
-    ))
-
-    df_hub_map = (
-        df.groupby("cidade_origem")
-        .agg(volume=("pedido_id", "count"), otd=("no_prazo", "mean"))
-        .reset_index()
-    )
-    df_hub_map["lat"] = df_hub_map["cidade_origem"].map(lambda x: HUB_COORDS[x]["lat"])
-    df_hub_map["lon"] = df_hub_map["cidade_origem"].map(lambda x: HUB_COORDS[x]["lon"])
-
-    fig.add_trace(go.Scattergeo(
-        lat=df_hub_map["lat"], lon=df_hub_map["lon"],
-        text=df_hub_map.apply(
-            lambda r: f"<b>Hub: {r['cidade_origem']}</b><br>"
-                      f"Volume: {fmt_num(r['volume'])}<br>"
-                      f"OTD: {r['otd']*100:.1f}%", axis=1
-        ),
-        hoverinfo="text",
-        marker=dict(
-            size=df_hub_map["volume"] / df_hub_map["volume"].max() * 30 + 14,
-            color="#1E40AF", opacity=0.95,
-            line=dict(width=3, color="white"), sizemode="diameter",
-            symbol="circle",
-        ),
-        showlegend=False,
-    ))
+    def _tracos_rotas(df_r, vmax, cor, largura_min, escala, alerta=""):
+        """Traços de linha das rotas: um por rota ou agrupados por faixa de espessura.
+
+        No modo compacto as espessuras são arredondadas para múltiplos de 0,25 e
+        cada faixa vira um único traço, com segmentos separados por None e sem
+        hover: o hover fica nos marcadores de destino (`customdata` com um
+        `hovertemplate` único), em vez de um texto HTML por ponto.
+        """
+        larguras = (df_r["volume"] / vmax * escala).clip(lower=largura_min).tolist()
+        segmentos = list(zip(df_r["orig_lat"], df_r["dest_lat"], df_r["orig_lon"], df_r["dest_lon"], larguras))
+
+        if not render_compacto:
+            textos = [
+                f"<b>{o} → {d}</b><br>"
+                f"Volume: {v}<br>"
+                f"Atraso médio: {a:.1f} dias{alerta}<br>"
+                f"Custo total: {fmt_brl(c, 0)}"
+                for o, d, v, a, c in zip(
+                    df_r["cidade_origem"], df_r["cidade_destino"], df_r["volume"],
+                    df_r["atraso_medio"], df_r["custo_total"],
+                )
+            ]
+            return [
+                go.Scattergeo(
+                    lat=[lat0, lat1], lon=[lon0, lon1], mode="lines",
+                    line=dict(width=w, color=cor), hoverinfo="text", text=txt, showlegend=False,
+                )
+                for (lat0, lat1, lon0, lon1, w), txt in zip(segmentos, textos)
+            ]
+
+        faixas = {}
+        for lat0, lat1, lon0, lon1, w in segmentos:
+            lat, lon = faixas.setdefault(round(w * 4) / 4, ([], []))
+            lat += [lat0, lat1, None]
+            lon += [lon0, lon1, None]
+        return [
+            go.Scattergeo(
+                lat=lat, lon=lon, mode="lines",
+                line=dict(width=w, color=cor), hoverinfo="skip", showlegend=False,
+            )
+            for w, (lat, lon) in sorted(faixas.items())
+        ]
 
-    
-    fig.add_trace(go.Scattergeo(
-        lat=df_hub_map["lat"] + 1.0, lon=df_hub_map["lon"],
-        text=df_hub_map["cidade_origem"], mode="text",
-        textfont=dict(size=12, color="#0F172A", family="Inter"),
-        hoverinfo="skip", showlegend=False,
-    ))
-
-    fig.update_geos(
-        scope="south america",
-        showland=True, landcolor="#F1F5F9",
-        showocean=True, oceancolor="#EFF6FF",
-        showcountries=True, countrycolor="#CBD5E1",
-        showcoastlines=True, coastlinecolor="#94A3B8",
-        showframe=False,
-        lonaxis_range=[-58, -28], lataxis_range=[-34, 2],
-        bgcolor="white",
-    )
-    fig.update_layout(
-        **CHART_LAYOUT, height=600, showlegend=False,
-        title="Fluxos de Entrega — Origem (Hubs) → Destinos",
-        geo=dict(bgcolor="white"),
-    )
     st.markdown(
         '<div style="font-size:12px;color:#475569;padding:10px 14px;margin-top:8px;'
         'background:#FFFBEB;border-radius:6px;border:1px solid #FDE68A;line-height:1.7;">'
@@ -880,8 +1182,85 @@ with tab_mapa:
     
     st.markdown("<div style='height:20px'></div>", unsafe_allow_html=True)
 
-    _apply_axis_style(fig)
-    st.plotly_chart(fig, width='stretch', theme=None)
+    def _fig_mapa_rotas():
+        vmax_top = df_top["volume"].max()
+        fig = go.Figure()
+        fig.add_traces(_tracos_rotas(df_top[~df_top["is_delayed"]], vmax_top, "rgba(37,99,235,0.3)", 0.5, 3))
+        fig.add_traces(_tracos_rotas(df_top[df_top["is_delayed"]], vmax_top, "rgba(220,38,38,0.4)", 0.8, 3.5, " ⚠"))
+
+        # No modo compacto o hover das rotas é o dos destinos: os valores vão
+        # em customdata e o HTML do hover é um só template para o traço
+        hover = dict(hoverinfo="skip")
+        if render_compacto:
+            hover = dict(
+                customdata=list(zip(
+                    df_top["cidade_origem"], df_top["cidade_destino"], df_top["volume"],
+                    [f"{a:.1f}" for a in df_top["atraso_medio"]], df_top["is_delayed"].map({True: " ⚠", False: ""}),
+                    [fmt_brl(c, 0) for c in df_top["custo_total"]],
+                )),
+                hovertemplate=(
+                    "<b>%{customdata[0]} → %{customdata[1]}</b><br>"
+                    "Volume: %{customdata[2]}<br>"
+                    "Atraso médio: %{customdata[3]} dias%{customdata[4]}<br>"
+                    "Custo total: %{customdata[5]}<extra></extra>"
+                ),
+            )
+        fig.add_trace(go.Scattergeo(
+            lat=df_top["dest_lat"], lon=df_top["dest_lon"],
+            mode="markers",
+            marker=dict(
+                size=4, color=df_top["is_delayed"].map({True: DANGER, False: "#93C5FD"}),
+                opacity=0.6, line=dict(width=0),
+            ),
+            showlegend=False, **hover,
+        ))
+
+        df_hub_map = t_mapa["hub_map"]
+
+        fig.add_trace(go.Scattergeo(
+            lat=df_hub_map["lat"], lon=df_hub_map["lon"],
+            text=df_hub_map.apply(
+                lambda r: f"<b>Hub: {r['cidade_origem']}</b><br>"
+                          f"Volume: {fmt_num(r['volume'])}<br>"
+                          f"OTD: {r['otd']*100:.1f}%", axis=1
+            ),
+            hoverinfo="text",
+            marker=dict(
+                size=df_hub_map["volume"] / df_hub_map["volume"].max() * 30 + 14,
+                color="#1E40AF", opacity=0.95,
+                line=dict(width=3, color="white"), sizemode="diameter",
+                symbol="circle",
+            ),
+            showlegend=False,
+        ))
+
+    
+        fig.add_trace(go.Scattergeo(
+            lat=df_hub_map["lat"] + 1.0, lon=df_hub_map["lon"],
+            text=df_hub_map["cidade_origem"], mode="text",
+            textfont=dict(size=12, color="#0F172A", family="Inter"),
+            hoverinfo="skip", showlegend=False,
+        ))
+
+        fig.update_geos(
+            scope="south america",
+            showland=True, landcolor="#F1F5F9",
+            showocean=True, oceancolor="#EFF6FF",
+            showcountries=True, countrycolor="#CBD5E1",
+            showcoastlines=True, coastlinecolor="#94A3B8",
+            showframe=False,
+            lonaxis_range=[-58, -28], lataxis_range=[-34, 2],
+            bgcolor="white",
+        )
+        fig.update_layout(
+            **CHART_LAYOUT, height=600, showlegend=False,
+            title="Fluxos de Entrega — Origem (Hubs) → Destinos",
+            geo=dict(bgcolor="white"),
+        )
+        _apply_axis_style(fig)
+        return fig
+
+    plotar(figura("mapa_rotas", _fig_mapa_rotas, top_n, render_compacto), "Mapa · rotas", len(df_top))
 
     
     st.markdown(
@@ -908,11 +1287,7 @@ with tab_mapa:
     with col_sk:
         st.markdown(section_title("activity", "Fluxo: Origem → Transportadora"), unsafe_allow_html=True)
 
-        df_flow = (
-            df.groupby(["cidade_origem", "transportadora"])
-            .agg(volume=("pedido_id", "count"), taxa_atraso=("atrasado", "mean"))
-            .reset_index()
-        )
+        df_flow = t_mapa["flow"]
         origins  = sorted(df_flow["cidade_origem"].unique())
         transps  = sorted(df_flow["transportadora"].unique())
         nodes    = origins + transps
@@ -920,30 +1295,33 @@ with tab_mapa:
 
         avg_delay_rate = df_flow["taxa_atraso"].mean()
 
-        fig = go.Figure(go.Sankey(
-            node=dict(
-                pad=20, thickness=22,
-                line=dict(color="white", width=2),
-                label=nodes,
-                color=["#1E40AF"] * len(origins) + [COLOR_TRANSPORT.get(t, ACCENT) for t in transps],
-            ),
-            link=dict(
-                source=[node_idx[r["cidade_origem"]] for _, r in df_flow.iterrows()],
-                target=[node_idx[r["transportadora"]] for _, r in df_flow.iterrows()],
-                value=df_flow["volume"].tolist(),
-                color=[
-                    "rgba(220,38,38,0.25)" if r["taxa_atraso"] > avg_delay_rate
-                    else "rgba(37,99,235,0.12)"
-                    for _, r in df_flow.iterrows()
-                ],
-            ),
-        ))
-        fig.update_layout(
-            **CHART_LAYOUT, height=450,
-            title=dict(text="Fluxo de Pedidos por Rota", font=dict(size=16, color="#0F172A")),
-        )
-        _apply_axis_style(fig)
-        st.plotly_chart(fig, width='stretch', theme=None)
+        def _fig_mapa_sankey():
+            fig = go.Figure(go.Sankey(
+                node=dict(
+                    pad=20, thickness=22,
+                    line=dict(color="white", width=2),
+                    label=nodes,
+                    color=["#1E40AF"] * len(origins) + [COLOR_TRANSPORT.get(t, ACCENT) for t in transps],
+                ),
+                link=dict(
+                    source=[node_idx[r["cidade_origem"]] for _, r in df_flow.iterrows()],
+                    target=[node_idx[r["transportadora"]] for _, r in df_flow.iterrows()],
+                    value=df_flow["volume"].tolist(),
+                    color=[
+                        "rgba(220,38,38,0.25)" if r["taxa_atraso"] > avg_delay_rate
+                        else "rgba(37,99,235,0.12)"
+                        for _, r in df_flow.iterrows()
+                    ],
+                ),
+            ))
+            fig.update_layout(
+                **CHART_LAYOUT, height=450,
+                title=dict(text="Fluxo de Pedidos por Rota", font=dict(size=16, color="#0F172A")),
+            )
+            _apply_axis_style(fig)
+            return fig
+
+        plotar(figura("mapa_sankey", _fig_mapa_sankey), "Mapa · Sankey", len(df_flow))
 
         st.markdown(
             f'<div style="font-size:11px;color:#94A3B8;padding:8px 12px;'
@@ -962,27 +1340,88 @@ with tab_mapa:
             unsafe_allow_html=True,
         )
 
-        df_heat = df.pivot_table(
-            index="cidade_origem", columns="transportadora",
-            values="atraso_dias", aggfunc="mean",
-        ).round(1)
+        df_heat = t_mapa["heat"]
 
-        fig = px.imshow(
-            df_heat, text_auto=True,
-            color_continuous_scale=["#DBEAFE", "#2563EB", "#DC2626"],
-            aspect="auto",
-        )
-        fig.update_layout(
-            **CHART_LAYOUT,
-            title="Hub × Transportadora",
-            xaxis_title="Transportadora", yaxis_title="Hub de Origem",
-            height=450, coloraxis_colorbar_title="Dias",
-        )
-        _apply_axis_style(fig)
-        st.plotly_chart(fig, width='stretch', theme=None)
+        def _fig_mapa_calor():
+            fig = px.imshow(
+                df_heat, text_auto=True,
+                color_continuous_scale=["#DBEAFE", "#2563EB", "#DC2626"],
+                aspect="auto",
+            )
+            fig.update_layout(
+                **CHART_LAYOUT,
+                title="Hub × Transportadora",
+                xaxis_title="Transportadora", yaxis_title="Hub de Origem",
+                height=450, coloraxis_colorbar_title="Dias",
+            )
+            _apply_axis_style(fig)
+            return fig
 
+        plotar(figura("mapa_calor", _fig_mapa_calor), "Mapa · mapa de calor", df_heat.size)
 
-with tab_custo:
+    if sql:
+        return
+    st.markdown(section_title("package", "Pedidos por Rota"), unsafe_allow_html=True)
+    modo = st.radio(
+        "Detalhar", ["Rota (hub → destino)", "Hub × Transportadora"],
+        horizontal=True, key="drill_modo", label_visibility="collapsed",
+    )
+    c_grupo, c_coluna, c_ordem, c_pagina = st.columns([3, 2, 2, 1])
+
+    # Rotas exibidas no mapa, com as de atraso acima da média (vermelhas) primeiro
+    if modo == "Hub × Transportadora":
+        chaves = ("cidade_origem", "transportadora")
+        grupos = t_mapa["flow"].sort_values("taxa_atraso", ascending=False)
+        rotulo = "Hub × Transportadora"
+    else:
+        chaves = ("cidade_origem", "cidade_destino")
+        grupos = df_top.sort_values(["is_delayed", "volume"], ascending=False)
+        rotulo = "Rota"
+    with c_grupo:
+        grupo = st.selectbox(
+            rotulo, list(zip(grupos[chaves[0]], grupos[chaves[1]])),
+            format_func=lambda g: f"{g[0]} → {g[1]}", key=f"drill_{chaves[1]}",
+        )
+    with c_coluna:
+        coluna = st.selectbox(
+            "Ordenar por", ["atraso_dias", "data_pedido", "custo_transporte", "prazo_real_dias", "pedido_id"],
+            format_func=COLUNAS_PEDIDOS.get, key="drill_coluna",
+        )
+    with c_ordem:
+        crescente = st.selectbox("Ordem", ["Decrescente", "Crescente"], key="drill_ordem") == "Crescente"
+
+    filtrados = []
+
+    def _pedidos_grupo():
+        # Posições do grupo na seleção, refeitas no máximo uma vez por rerun
+        if not filtrados:
+            pos = base.grupos(*chaves).posicoes(*grupo)
+            filtrados.append(filtrar_posicoes(base.frame, pos, data_inicio, data_fim, **filtros_sel))
+        return filtrados[0]
+
+    # O cache guarda só o total e as páginas visitadas, não as posições do grupo
+    total = memo_sel(("pedidos", "total", chaves, grupo), lambda: len(_pedidos_grupo()))
+    paginas = max(1, -(-total // TAMANHO_PAGINA))
+    if st.session_state.get("drill_pagina", 1) > paginas:
+        st.session_state["drill_pagina"] = paginas
+    with c_pagina:
+        numero = st.number_input("Página", min_value=1, max_value=paginas, key="drill_pagina")
+    inicio = (numero - 1) * TAMANHO_PAGINA
+
+    def _pagina():
+        ordenados = ordenar_posicoes(base.frame, _pedidos_grupo(), coluna, crescente)
+        return ordenados[inicio:inicio + TAMANHO_PAGINA].copy()  # cópia: não prende o array inteiro
+
+    pos = memo_sel(("pedidos", chaves, grupo, coluna, crescente, inicio), _pagina)
+    df_pag = pagina(base.frame, pos, 1, TAMANHO_PAGINA)
+    st.dataframe(df_pag, width='stretch', hide_index=True)
+    st.caption(f"{fmt_num(total)} pedidos · página {numero} de {paginas}")
+    perfil.marcar("Mapa · pedidos da rota", len(df_pag))
+
+
+def render_custos():
+    """Aba Análise de Custos."""
+    t_custo = tabelas_estimaveis("custos", tabelas_custos)
     col_tree, col_bar = st.columns([3, 2])
 
     with col_tree:
@@ -990,106 +1429,122 @@ with tab_custo:
             section_title("bar-chart", "Custo Logístico por Hub e Transportadora"),
             unsafe_allow_html=True,
         )
-        df_tree = (
-            df.groupby(["cidade_origem", "transportadora"])["custo_transporte"]
-            .sum().reset_index()
-        )
-        fig = px.treemap(
-            df_tree, path=["cidade_origem", "transportadora"],
-            values="custo_transporte", color="custo_transporte",
-            color_continuous_scale=["#DBEAFE", "#2563EB", "#1E40AF"],
-        )
-        fig.update_layout(
-            **CHART_LAYOUT, title="Distribuição do Custo Total de Frete",
-            height=460, coloraxis_colorbar_title="Custo (R$)",
-        )
-        fig.update_traces(
-            textinfo="label+value",
-            texttemplate="%{label}<br>R$ %{value:,.0f}",
-            textfont=dict(size=12, color="#FFFFFF"),
-        )
-        _apply_axis_style(fig)
-        st.plotly_chart(fig, width='stretch', theme=None)
+        df_tree = t_custo["tree"]
+
+        def _fig_custo_treemap():
+            fig = px.treemap(
+                df_tree, path=["cidade_origem", "transportadora"],
+                values="custo_transporte", color="custo_transporte",
+                color_continuous_scale=["#DBEAFE", "#2563EB", "#1E40AF"],
+            )
+            fig.update_layout(
+                **CHART_LAYOUT, title="Distribuição do Custo Total de Frete",
+                height=460, coloraxis_colorbar_title="Custo (R$)",
+            )
+            fig.update_traces(
+                textinfo="label+value",
+                texttemplate="%{label}<br>R$ %{value:,.0f}",
+                textfont=dict(size=12, color="#FFFFFF"),
+            )
+            _apply_axis_style(fig)
+            return fig
+
+        plotar(figura("custo_treemap", _fig_custo_treemap, nivel), "Custos · treemap", len(df_tree))
 
     with col_bar:
         st.markdown(
             section_title("truck", "Custo Médio por Transportadora"),
             unsafe_allow_html=True,
         )
-        df_ct = (
-            df.groupby("transportadora")["custo_transporte"]
-            .mean().reset_index()
-            .sort_values("custo_transporte", ascending=True)
-        )
-        fig = px.bar(
-            df_ct, x="custo_transporte", y="transportadora",
-            orientation="h",
-            text=df_ct["custo_transporte"].apply(lambda v: fmt_brl(v)),
+        df_ct = t_custo["ct"]
+
+        def _fig_custo_medio():
+            fig = px.bar(
+                df_ct, x="custo_transporte", y="transportadora",
+                orientation="h",
+                text=df_ct["custo_transporte"].apply(lambda v: fmt_brl(v)),
+                color="transportadora", color_discrete_map=COLOR_TRANSPORT,
+                error_x=ic(df_ct, ("transportadora",), "custo_medio"),
+            )
+            fig.update_traces(textposition="outside", textfont_size=12)
+            fig.update_layout(
+                **CHART_LAYOUT, title="Custo Médio por Entrega",
+                xaxis_title="R$", yaxis_title="",
+                showlegend=False, height=460,
+            )
+            _apply_axis_style(fig)
+            return fig
+
+        plotar(figura("custo_medio", _fig_custo_medio, nivel), "Custos · custo médio", len(df_ct))
+
+    st.markdown(
+        section_title("trending-up", "Evolução Mensal do Custo de Frete"),
+        unsafe_allow_html=True,
+    )
+    df_cm = t_custo["cm"]
+    proj = projecao()
+
+    def _fig_custo_mensal():
+        faixa = ic(df_cm, ("mes", "transportadora"), "custo")
+        fig = px.area(
+            df_cm, x="mes", y="custo_transporte",
             color="transportadora", color_discrete_map=COLOR_TRANSPORT,
+            hover_data={"IC 95% (± R$)": faixa.round(2)} if faixa is not None else None,
         )
-        fig.update_traces(textposition="outside", textfont_size=12)
+        if proj is not None:
+            # Áreas projetadas empilhadas na mesma ordem das observadas e, por
+            # cima, a faixa de 95% do total
+            ordem = {t.name: i for i, t in enumerate(fig.data)}
+            proj_ord = proj.sort_values("transportadora", key=lambda c: c.map(ordem), kind="stable")
+            fig.add_traces(tracos_projecao(
+                df_cm, "custo_transporte", proj_ord, "custo", ",.0f", prefixo="R$ ",
+                stackgroup="projecao",
+            ))
+            total = projecao(())
+            if total is not None:
+                real_total = df_cm.groupby("mes", as_index=False)["custo_transporte"].sum()
+                banda, linha = tracos_projecao(
+                    real_total.assign(transportadora="Total"), "custo_transporte",
+                    total.assign(transportadora="Total"), "custo", ",.0f", prefixo="R$ ",
+                )
+                banda.update(fillcolor="rgba(71,85,105,0.12)")
+                linha.update(line_color="#475569")
+                fig.add_traces([banda, linha])
         fig.update_layout(
-            **CHART_LAYOUT, title="Custo Médio por Entrega",
-            xaxis_title="R$", yaxis_title="",
-            showlegend=False, height=460,
+            **CHART_LAYOUT,
+            title="Custo Total de Frete por Mês",
+            xaxis_title="", yaxis_title="R$", height=360,
+            legend_title="Transportadora", hovermode="x unified",
         )
         _apply_axis_style(fig)
-        st.plotly_chart(fig, width='stretch', theme=None)
+        return fig
 
-    st.markdown(
-        section_title("trending-up", "Evolução Mensal do Custo de Frete"),
-        unsafe_allow_html=True,
-    )
-    df_cm = (
-        df.groupby([df["mes"], "transportadora"])["custo_transporte"]
-        .sum().reset_index()
-    )
-    fig = px.area(
-        df_cm, x="mes", y="custo_transporte",
-        color="transportadora", color_discrete_map=COLOR_TRANSPORT,
-    )
-    fig.update_layout(
-        **CHART_LAYOUT,
-        title="Custo Total de Frete por Mês",
-        xaxis_title="", yaxis_title="R$", height=360,
-        legend_title="Transportadora", hovermode="x unified",
-    )
-    _apply_axis_style(fig)
-    st.plotly_chart(fig, width='stretch', theme=None)
+    plotar(figura("custo_mensal", _fig_custo_mensal, nivel), "Custos · evolução mensal", len(df_cm))
+    if proj is not None:
+        st.caption(
+            f"Pontilhado: projeção dos próximos {HORIZONTE} meses por transportadora; "
+            "faixa cinza: intervalo de 95% do custo total projetado."
+        )
 
     st.markdown(section_title("target", "Eficiência de Custo por Hub"), unsafe_allow_html=True)
 
-    df_eff = (
-        df.groupby("cidade_origem")
-        .agg(
-            custo_total=("custo_transporte", "sum"),
-            custo_medio=("custo_transporte", "mean"),
-            volume=("pedido_id", "count"),
-            otd=("no_prazo", "mean"),
-        )
-        .reset_index()
-    )
-    df_eff["custo_por_entrega_otd"] = df_eff["custo_total"] / (df_eff["otd"] * df_eff["volume"])
-    df_eff["otd"]                   = (df_eff["otd"] * 100).round(1)
-    df_eff["custo_medio"]           = df_eff["custo_medio"].round(2)
-    df_eff["custo_total"]           = df_eff["custo_total"].round(2)
-    df_eff["custo_por_entrega_otd"] = df_eff["custo_por_entrega_otd"].round(2)
-    df_eff.columns = [
-        "Hub", "Custo Total (R$)", "Custo Médio (R$)",
-        "Volume", "OTD (%)", "Custo / Entrega no Prazo (R$)",
-    ]
+    df_eff = t_custo["eff"]
     st.dataframe(df_eff, width='stretch', hide_index=True)
+    perfil.marcar("Custos · tabela de eficiência", len(df_eff))
 
 
-with tab_decisao:
+def render_decisao():
+    """Aba Decisões para Gestão."""
     st.markdown(
         section_title("zap", "Insights Automáticos para Tomada de Decisão"),
         unsafe_allow_html=True,
     )
 
-    grp_transp_otd   = df.groupby("transportadora")["no_prazo"].mean()
-    grp_transp_custo = df.groupby("transportadora")["custo_transporte"].mean()
-    grp_hub_otd      = df.groupby("cidade_origem")["no_prazo"].mean()
+    t_decisao = memo_sel("decisao", lambda: tabelas_decisao(agregados()))
+
+    grp_transp_otd   = t_decisao["transp_otd"]
+    grp_transp_custo = t_decisao["transp_custo"]
+    grp_hub_otd      = t_decisao["hub_otd"]
 
     best_t   = grp_transp_otd.idxmax()
     best_tv  = grp_transp_otd.max() * 100
@@ -1106,11 +1561,7 @@ with tab_decisao:
     worst_h  = grp_hub_otd.idxmin()
     worst_hv = grp_hub_otd.min() * 100
 
-    df_combo = (
-        df.groupby(["cidade_origem", "transportadora"])
-        .agg(otd=("no_prazo", "mean"), volume=("pedido_id", "count"), atraso=("atraso_dias", "mean"))
-        .reset_index()
-    )
+    df_combo = t_decisao["combo"]
     worst_combo = df_combo.loc[df_combo["otd"].idxmin()]
     best_combo  = df_combo.loc[df_combo["otd"].idxmax()]
 
@@ -1207,8 +1658,100 @@ with tab_decisao:
             f"que contribuem para o OTD de {best_hv:.1f}%.",
             "success",
         ), unsafe_allow_html=True)
+    perfil.marcar("Decisões · insights")
+
+
+def render_explorador():
+    """Aba Explorador de Pedidos: todos os pedidos da seleção, uma página por vez."""
+    st.markdown(section_title("package", "Explorador de Pedidos"), unsafe_allow_html=True)
+    if sql:
+        st.info("O explorador lê as linhas dos pedidos e não está disponível com o motor SQL.")
+        return
+    c_busca, c_coluna, c_ordem, c_tamanho, c_pagina = st.columns([3, 2, 2, 1, 1])
+    with c_busca:
+        busca = st.text_input(
+            "Buscar cidade", key="explorador_busca", placeholder="Hub ou destino (sem distinguir acentos)",
+        )
+    with c_coluna:
+        coluna = st.selectbox(
+            "Ordenar por", ExploradorPedidos.ORDENAVEIS,
+            format_func=COLUNAS_PEDIDOS.get, key="explorador_coluna",
+        )
+    with c_ordem:
+        crescente = st.selectbox("Ordem", ["Decrescente", "Crescente"], key="explorador_ordem") == "Crescente"
+    with c_tamanho:
+        tamanho = st.selectbox("Linhas", [25, TAMANHO_PAGINA, 100], index=1, key="explorador_tamanho")
+
+    busca = busca.strip()
+    explorador = base.explorador
+    mascaras = []
+
+    def _mascara():
+        # Refeita no máximo uma vez por rerun, só quando o total ou a página faltam no cache
+        if not mascaras:
+            mascaras.append(explorador.mascara(data_inicio, data_fim, busca, **filtros_sel))
+        return mascaras[0]
+
+    # O cache guarda só o total e as páginas visitadas, nunca a seleção inteira
+    total = memo_sel(("explorador", "total", busca), lambda: int(_mascara().sum()))
+    paginas = max(1, -(-total // tamanho))
+    if st.session_state.get("explorador_pagina", 1) > paginas:
+        st.session_state["explorador_pagina"] = paginas
+    with c_pagina:
+        numero = st.number_input("Página", min_value=1, max_value=paginas, key="explorador_pagina")
+    inicio = (numero - 1) * tamanho
+
+    def _pagina():
+        # Continua do cursor salvo na sessão mais próximo antes da página (o
+        # início ou o fim da última calculada), em vez do começo da permutação
+        chave = (assinatura, busca, coluna, crescente)
+        salvos = st.session_state.get("explorador_cursores")
+        cursores = salvos[1] if salvos and salvos[0] == chave else ()
+        cursor = max((c for c in cursores if c[1] <= inicio), key=lambda c: c[1], default=(0, 0))
+        pos, fim = explorador.fatia(_mascara(), coluna, crescente, inicio, tamanho, cursor)
+        st.session_state["explorador_cursores"] = (chave, (cursor, fim))
+        return pos
+
+    pos = memo_sel(("explorador", busca, coluna, crescente, inicio, tamanho), _pagina)
+    df_pag = pagina(base.frame, pos, 1, tamanho)
+    st.dataframe(df_pag, width='stretch', hide_index=True)
+    st.caption(f"{fmt_num(total)} pedidos · página {numero} de {paginas}")
+    perfil.marcar("Explorador · página", len(df_pag))
+
+
+# Só a aba selecionada é executada a cada rerun; as tabelas de cada aba ficam
+# no cache LRU, então voltar a uma aba já visitada é imediato.
+ABAS = {
+    "Performance":          render_performance,
+    "Mapa & Fluxos":        render_mapa,
+    "Análise de Custos":    render_custos,
+    "Decisões para Gestão": render_decisao,
+    "Explorador de Pedidos": render_explorador,
+}
+aba = st.radio("Aba", list(ABAS), horizontal=True, key="aba", label_visibility="collapsed")
+ABAS[aba]()
+
+if perfil.ativo:
+    with st.expander("Diagnóstico de desempenho deste rerun", expanded=True):
+        st.caption(
+            "tempo_ms: da seção anterior até o fim desta (preparo + figura + envio); "
+            "envio_ms: serialização e envio da figura ao navegador; "
+            "linhas: linhas/células processadas; figura_kb: tamanho do JSON do Plotly."
+        )
+        df_perfil = perfil.tabela()
+        st.dataframe(df_perfil.round(2), width='stretch', hide_index=True)
+        st.download_button(
+            "Exportar CSV", df_perfil.to_csv(index=False, sep=";").encode("utf-8"),
+            file_name="perfil_dashboard.csv", mime="text/csv",
+        )
 
 
 st.markdown("---")
 st.markdown("<p style='text-align: center; color: #808080;'>Dashboard de Performance Logística | Desenvolvido para a cadeira de Fundamentos em Ciência da Dados 2025.2</p>", unsafe_allow_html=True)
-st.markdown("<p style='text-align: center; color: #808080;'>2026 - Rafael Alves</p>", unsafe_allow_html=True)
\ No newline at end of file
+st.markdown("<p style='text-align: center; color: #808080;'>2026 - Rafael Alves</p>", unsafe_allow_html=True)
+
+# Página estimada já enviada: o próximo rerun refina um nível da amostra.
+# Uma mudança de filtro interrompe o refino e recomeça do menor nível.
+if nivel is not None:
+    st.session_state["refino"] = (assinatura, nivel + 1)
+    st.rerun()
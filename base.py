@@ -0,0 +1,110 @@
+"""Base em memória do dashboard: linhas, cubo e índice, atualizada por anexação."""
+import threading
+
+from agregacoes import construir_cubo, mesclar_cubos
+from amostra import AmostraEstratificada
+from dados import FONTE, ArquivoReescrito, LeitorIncremental, concatenar
+from filtros import IndiceFiltro
+from pedidos import ExploradorPedidos, IndiceGrupos
+from previsao import PrevisoesMensais
+from quantis import HistogramasDias
+from rotas import CuboRotas
+
+
+class BaseDados:
+    """Dados de um processo, compartilhados (somente leitura) entre as sessões.
+
+    Com um único CSV, as linhas vêm mapeadas do snapshot colunar
+    (`abrir_colunas`), sem cópia no heap; várias partições são concatenadas
+    uma vez por base. Em memória própria ficam o cubo, o índice, o cubo de
+    rotas e os deltas.
+
+    `atualizar()` incorpora as linhas anexadas à fonte: só o delta é lido e
+    enriquecido, o cubo recebe o cubo do delta e o índice é refeito sobre as
+    células (não sobre as linhas); os histogramas de prazos (`quantis`) somam
+    os do delta. Cada atualização gera um índice com nova versão, o que
+    invalida naturalmente as entradas do cache LRU.
+    """
+
+    def __init__(self, fonte=FONTE, arquivos=None):
+        self.fonte = fonte
+        self.arquivos = arquivos
+        self._lock = threading.Lock()
+        self._amostra = None
+        self._grupos = (None, {})
+        self._explorador = None
+        self._previsoes = None
+        self._recarregar()
+
+    def _recarregar(self):
+        self._leitor = LeitorIncremental(self.fonte, arquivos=self.arquivos)
+        df = self._leitor.carregar()
+        self._partes = [df]
+        self.indice = IndiceFiltro(construir_cubo(df))
+        self.rotas = CuboRotas.de_linhas(df, lambda: self.frame)
+        self.quantis = HistogramasDias.de_linhas(df)
+
+    @property
+    def cubo(self):
+        return self.indice.frame
+
+    @property
+    def frame(self):
+        """Linhas enriquecidas; os deltas só são concatenados quando pedidos."""
+        with self._lock:
+            if len(self._partes) > 1:
+                self._partes = [concatenar(self._partes)]
+            return self._partes[0]
+
+    @property
+    def amostra(self):
+        """Amostra estratificada do modo aproximado, refeita a cada versão do índice."""
+        indice = self.indice
+        if self._amostra is None or self._amostra[0] != indice.versao:
+            self._amostra = (indice.versao, AmostraEstratificada(self.frame))
+        return self._amostra[1]
+
+    @property
+    def explorador(self):
+        """Explorador de pedidos (permutações de ordenação), refeito a cada versão do índice."""
+        indice = self.indice
+        if self._explorador is None or self._explorador[0] != indice.versao:
+            self._explorador = (indice.versao, ExploradorPedidos(self.frame))
+        return self._explorador[1]
+
+    @property
+    def previsoes(self):
+        """Projeções mensais de OTD e custo, ajustadas sobre o cubo a cada versão do índice."""
+        indice = self.indice
+        if self._previsoes is None or self._previsoes[0] != indice.versao:
+            self._previsoes = (indice.versao, PrevisoesMensais(indice.frame))
+        return self._previsoes[1]
+
+    def grupos(self, *chaves):
+        """Índice de posições das linhas por `chaves`, construído na primeira consulta.
+
+        Refeito quando o índice muda de versão (linhas novas).
+        """
+        versao = self.indice.versao
+        if self._grupos[0] != versao:
+            self._grupos = (versao, {})
+        por_chaves = self._grupos[1]
+        if chaves not in por_chaves:
+            por_chaves[chaves] = IndiceGrupos(self.frame, chaves)
+        return por_chaves[chaves]
+
+    def atualizar(self):
+        """Incorpora as linhas novas da fonte; retorna quantas entraram."""
+        with self._lock:
+            try:
+                delta = self._leitor.novos()
+            except ArquivoReescrito:
+                self._recarregar()
+                return len(self._partes[0])
+            if delta is None or delta.empty:
+                return 0
+            self._partes.append(delta)
+            self.quantis = self.quantis.mesclar(HistogramasDias.de_linhas(delta))
+            self.indice = IndiceFiltro(mesclar_cubos(self.indice.frame, construir_cubo(delta)))
+            self.rotas = self.rotas.mesclar(delta, lambda: self.frame)
+            return len(delta)
@@ -0,0 +1,224 @@
+"""Benchmark sem interface do dashboard sobre bases sintéticas ou reais.
+
+Mede carga (CSV e snapshot), cubo, índice, filtro da barra lateral, KPIs,
+preparação das tabelas de cada aba e, via AppTest do Streamlit, a execução
+do app em cada aba (construção das figuras). Cada etapa registra o tempo
+(mediana das repetições) e o pico de memória residente do processo.
+
+Uso:
+    python benchmark.py 1M                      # gera a base se necessário
+    python benchmark.py --csv FCD_logistica.csv
+    python benchmark.py --comparar antes.json depois.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from sintetico import caminho_padrao, gerar_csv, parse_linhas
+
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+
+ABAS = (
+    "Performance", "Mapa & Fluxos", "Análise de Custos", "Decisões para Gestão", "Explorador de Pedidos",
+)
+
+
+def _rss_pico_mb():
+    # ru_maxrss é o pico do processo até aqui, em KiB no Linux (bytes no macOS)
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1 << 20) if sys.platform == "darwin" else pico / 1024
+
+
+class Medidor:
+    """Acumula as etapas medidas: tempo (mediana) e pico de memória."""
+
+    def __init__(self, repeticoes=3):
+        self.repeticoes = repeticoes
+        self.etapas = []
+
+    def medir(self, nome, fn, repeticoes=None):
+        tempos = []
+        for _ in range(repeticoes or self.repeticoes):
+            t0 = time.perf_counter()
+            resultado = fn()
+            tempos.append(time.perf_counter() - t0)
+        self.etapas.append({
+            "etapa":       nome,
+            "segundos":    statistics.median(tempos),
+            "min":         min(tempos),
+            "repeticoes":  len(tempos),
+            "rss_pico_mb": round(_rss_pico_mb(), 1),
+        })
+        print(f"  {nome:<32} {statistics.median(tempos):9.4f} s   pico {_rss_pico_mb():8.1f} MB", flush=True)
+        return resultado
+
+
+def _filtro_parcial(indice):
+    """Seleção típica: meio ano, sem uma transportadora, um hub e um status."""
+    datas = indice.frame["data_pedido"]
+    inicio = datas.iloc[0] + (datas.iloc[-1] - datas.iloc[0]) / 4
+    fim = inicio + (datas.iloc[-1] - datas.iloc[0]) / 2
+    return inicio, fim, {
+        dim: indice.valores(dim)[1:] for dim in ("transportadora", "cidade_origem", "status_entrega")
+    }
+
+
+def medir_camadas(csv, m):
+    """Etapas de dados, sem Streamlit: carga, cubo, índice, filtro e tabelas."""
+    from agregacoes import (
+        CHAVES_CUBO, CHAVES_ROTAS, construir_cubo, kpis, resumir_varios,
+        tabelas_custos, tabelas_decisao, tabelas_mapa, tabelas_performance,
+    )
+    from dados import carregar_dataset
+    from filtros import IndiceFiltro
+    from mapa import com_coordenadas
+    from pedidos import ExploradorPedidos
+    from previsao import PrevisoesMensais
+    from quantis import HistogramasDias
+    from rotas import CuboRotas
+
+    df = m.medir("carga:csv", lambda: carregar_dataset(csv), repeticoes=1)
+    df = m.medir("carga:snapshot", lambda: carregar_dataset(csv), repeticoes=1)
+    cubo = m.medir("cubo", lambda: construir_cubo(df), repeticoes=1)
+    m.medir("quantis", lambda: HistogramasDias.de_linhas(df), repeticoes=1)
+    cubo_rotas = m.medir("rotas", lambda: CuboRotas.de_linhas(df), repeticoes=1)
+    indice = m.medir("indice", lambda: IndiceFiltro(cubo), repeticoes=1)
+    previsoes = m.medir("previsao:ajuste", lambda: PrevisoesMensais(indice.frame), repeticoes=1)
+
+    todos = {dim: indice.valores(dim) for dim in ("transportadora", "cidade_origem", "status_entrega")}
+    datas = indice.frame["data_pedido"]
+    m.medir("filtro:completo", lambda: indice.filtrar(datas.iloc[0], datas.iloc[-1], **todos))
+    inicio, fim, parcial = _filtro_parcial(indice)
+    sel = m.medir("filtro:parcial", lambda: indice.filtrar(inicio, fim, **parcial))
+
+    rotas = m.medir("rotas:parcial", lambda: cubo_rotas.resumir(inicio, fim, **parcial))
+    m.medir("kpis", lambda: kpis(sel, rotas))
+    m.medir("previsao:agregar", lambda: previsoes.agregar(**parcial))
+    ag = m.medir("agregados", lambda: {**resumir_varios(sel, CHAVES_CUBO), CHAVES_ROTAS: rotas})
+    m.medir("prep:Performance", lambda: tabelas_performance(ag))
+    m.medir("prep:Mapa & Fluxos", lambda: com_coordenadas(tabelas_mapa(ag)))
+    m.medir("prep:Análise de Custos", lambda: tabelas_custos(ag))
+    m.medir("prep:Decisões para Gestão", lambda: tabelas_decisao(ag))
+
+    explorador = ExploradorPedidos(df)
+    m.medir("explorador:permutacao", lambda: explorador.permutacao("custo_transporte"), repeticoes=1)
+    mascara = m.medir("explorador:mascara", lambda: explorador.mascara(inicio, fim, **parcial))
+    m.medir("prep:Explorador de Pedidos", lambda: explorador.fatia(mascara, "custo_transporte", crescente=False))
+
+
+def medir_app(m):
+    """Execuções do app pelo AppTest: primeira carga, filtro e cada aba.
+
+    "fria" inclui o preparo das tabelas; na "quente" elas já estão no cache
+    LRU e o tempo é dominado pela construção e serialização das figuras.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(RAIZ, "app.py"), default_timeout=3600)
+    m.medir("app:primeira_execucao", at.run, repeticoes=1)
+    m.medir("app:filtro", lambda: at.multiselect[0].unselect(at.multiselect[0].value[0]).run(), repeticoes=1)
+    for aba in ABAS:
+        m.medir(f"app:{aba}:fria", lambda: at.radio(key="aba").set_value(aba).run(), repeticoes=1)
+        m.medir(f"app:{aba}:quente", at.run)
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+
+
+def _versao_codigo():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True,
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def executar(csv, repeticoes=3, com_app=True):
+    """Roda o benchmark sobre `csv` e retorna o relatório (dict serializável)."""
+    import pandas as pd
+
+    # dados.py lê a fonte e o diretório de cache do ambiente ao ser importado.
+    # O cache começa vazio: a primeira carga é sempre a partir do CSV.
+    os.environ["FCD_LOGISTICA"] = os.path.abspath(csv)
+    m = Medidor(repeticoes)
+    print(f"{csv}")
+    with tempfile.TemporaryDirectory() as cache:
+        os.environ["FCD_CACHE"] = cache
+        medir_camadas(csv, m)
+        if com_app:
+            medir_app(m)
+
+    with open(csv, "rb") as f:
+        linhas = sum(bloco.count(b"\n") for bloco in iter(lambda: f.read(1 << 24), b"")) - 1
+    return {
+        "data":    datetime.datetime.now().isoformat(timespec="seconds"),
+        "codigo":  _versao_codigo(),
+        "csv":     os.path.basename(csv),
+        "linhas":  linhas,
+        "bytes":   os.path.getsize(csv),
+        "motor":   os.environ.get("FCD_MOTOR", "pandas"),
+        "ambiente": {
+            "python":   platform.python_version(),
+            "pandas":   pd.__version__,
+            "sistema":  platform.platform(),
+            "cpus":     os.cpu_count(),
+        },
+        "etapas":  m.etapas,
+    }
+
+
+def comparar(antes, depois):
+    """Tabela etapa a etapa entre dois relatórios (razão < 1 = mais rápido)."""
+    a = {e["etapa"]: e for e in antes["etapas"]}
+    linhas = [f"{'etapa':<32} {'antes (s)':>10} {'depois (s)':>10} {'razão':>7}"]
+    for e in depois["etapas"]:
+        base = a.get(e["etapa"])
+        if base is None:
+            linhas.append(f"{e['etapa']:<32} {'-':>10} {e['segundos']:10.4f} {'-':>7}")
+            continue
+        razao = e["segundos"] / base["segundos"] if base["segundos"] else float("nan")
+        linhas.append(f"{e['etapa']:<32} {base['segundos']:10.4f} {e['segundos']:10.4f} {razao:7.2f}")
+    linhas.append(
+        f"{'pico de memória (MB)':<32} {max(e['rss_pico_mb'] for e in antes['etapas']):10.1f} "
+        f"{max(e['rss_pico_mb'] for e in depois['etapas']):10.1f}"
+    )
+    return "\n".join(linhas)
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("linhas", nargs="?", type=parse_linhas, help="tamanho da base sintética (1M, 10M, 50M)")
+    p.add_argument("--csv", help="usa um CSV existente em vez da base sintética")
+    p.add_argument("--repeticoes", type=int, default=3)
+    p.add_argument("--sem-app", action="store_true", help="não mede as execuções do app")
+    p.add_argument("--saida", default=os.path.join(".cache", "benchmarks"))
+    p.add_argument("--comparar", nargs=2, metavar=("ANTES", "DEPOIS"))
+    args = p.parse_args()
+
+    if args.comparar:
+        with open(args.comparar[0], encoding="utf-8") as fa, open(args.comparar[1], encoding="utf-8") as fb:
+            print(comparar(json.load(fa), json.load(fb)))
+        sys.exit(0)
+    if not (args.csv or args.linhas):
+        p.error("informe o número de linhas ou --csv")
+
+    csv = args.csv or caminho_padrao(args.linhas)
+    if not os.path.exists(csv):
+        print(f"gerando {csv} ...", flush=True)
+        gerar_csv(args.linhas, csv)
+
+    relatorio = executar(csv, args.repeticoes, com_app=not args.sem_app)
+    os.makedirs(args.saida, exist_ok=True)
+    nome = f"{os.path.splitext(relatorio['csv'])[0]}-{relatorio['codigo'] or 'sem-git'}-{relatorio['data'].replace(':', '')}.json"
+    with open(os.path.join(args.saida, nome), "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    print(f"relatório: {os.path.join(args.saida, nome)}")
@@ -0,0 +1,189 @@
+"""Exportação, em blocos, dos pedidos de uma seleção para CSV ou Parquet.
+
+Uso: python exportacao.py SAIDA.csv|SAIDA.parquet [--inicio 2024-01-01] [--fim 2024-12-31]
+     [--transportadora Loggi ...] [--hub Recife ...] [--status Entregue ...]
+
+O CSV sai no mesmo layout de FCD_logistica.csv (separador ";", datas
+dd/mm/aaaa); o Parquet mantém os tipos (datas e categorias). As linhas são
+percorridas em blocos e cada bloco é gravado antes de ler o próximo, então a
+memória não cresce com o tamanho da exportação.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from dados import CACHE_DIR, FONTE, carregar_dataset
+from pedidos import ExploradorPedidos
+
+
+# Linhas do frame percorridas por bloco
+BLOCO_EXPORTACAO = 500_000
+
+# Colunas da fonte, na ordem do CSV original
+COLUNAS_FONTE = (
+    "pedido_id", "data_pedido", "data_entrega", "transportadora", "cidade_origem",
+    "cidade_destino", "prazo_estimado_dias", "prazo_real_dias", "custo_transporte", "status_entrega",
+)
+
+EXTENSOES = {"csv": ".csv", "parquet": ".parquet"}
+
+# Exportações guardadas para download: removidas depois desta idade, ou as
+# mais antigas primeiro quando a pasta passa do limite de tamanho
+IDADE_EXPORTACOES = 6 * 3600
+MAX_BYTES_EXPORTACOES = 2 * 2 ** 30
+
+
+def formatos():
+    """Formatos disponíveis; Parquet só com o pacote pyarrow instalado."""
+    try:
+        import pyarrow.parquet  # noqa: F401
+        return ("csv", "parquet")
+    except ImportError:
+        return ("csv",)
+
+
+def blocos(frame, mascara, bloco=BLOCO_EXPORTACAO):
+    """Gera (linhas percorridas, bloco) com as linhas da máscara, nas colunas da fonte."""
+    for inicio in range(0, len(frame), bloco):
+        fim = min(inicio + bloco, len(frame))
+        pos = np.flatnonzero(mascara[inicio:fim]) + inicio
+        yield fim, frame.take(pos)[list(COLUNAS_FONTE)]
+    if not len(frame):
+        yield 0, frame[list(COLUNAS_FONTE)]
+
+
+def _formatar_datas(col, formato="%d/%m/%Y"):
+    """Datas como texto da fonte, formatando cada data distinta uma só vez (NaT → vazio)."""
+    codes, unicas = pd.factorize(col)
+    textos = np.append(unicas.strftime(formato).to_numpy(dtype=object), "")
+    return pd.Series(textos[codes], index=col.index, name=col.name)
+
+
+def _layout_fonte(parte):
+    return parte.assign(
+        data_pedido=_formatar_datas(parte["data_pedido"]),
+        data_entrega=_formatar_datas(parte["data_entrega"]),
+        custo_transporte=parte["custo_transporte"].astype("float64").round(2),
+    )
+
+
+def _gravar_csv(partes, tmp):
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        for i, parte in enumerate(partes):
+            _layout_fonte(parte).to_csv(f, sep=";", index=False, header=i == 0)
+
+
+def _gravar_parquet(partes, tmp):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    escritor = None
+    try:
+        for parte in partes:
+            tabela = pa.Table.from_pandas(
+                parte, preserve_index=False, schema=escritor and escritor.schema,
+            )
+            if escritor is None:
+                escritor = pq.ParquetWriter(tmp, tabela.schema)
+            escritor.write_table(tabela)
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+
+def exportar(frame, mascara, destino, formato="csv", progresso=None, bloco=BLOCO_EXPORTACAO):
+    """Grava em `destino` as linhas da máscara, bloco a bloco; retorna quantas foram.
+
+    `progresso(fracao)` é chamado após cada bloco. O arquivo é escrito num
+    temporário de nome único, na pasta do destino, e renomeado no fim: um
+    destino existente está sempre completo, mesmo com exportações
+    simultâneas para o mesmo destino.
+    """
+    if formato not in EXTENSOES:
+        raise ValueError(f"Formato de exportação desconhecido: {formato}")
+    total = max(len(frame), 1)
+    linhas = 0
+
+    def partes():
+        nonlocal linhas
+        for percorridas, parte in blocos(frame, mascara, bloco):
+            linhas += len(parte)
+            yield parte
+            if progresso is not None:
+                progresso(percorridas / total)
+
+    fd, tmp = tempfile.mkstemp(
+        prefix=os.path.basename(destino) + ".", suffix=".tmp", dir=os.path.dirname(destino) or ".",
+    )
+    os.close(fd)
+    try:
+        (_gravar_parquet if formato == "parquet" else _gravar_csv)(partes(), tmp)
+        os.replace(tmp, destino)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return linhas
+
+
+def limpar_exportacoes(pasta, manter=(), idade=IDADE_EXPORTACOES, max_bytes=MAX_BYTES_EXPORTACOES):
+    """Remove da pasta as exportações antigas; retorna quantos arquivos saíram.
+
+    Saem os arquivos com mais de `idade` segundos (inclusive temporários
+    abandonados) e, se a pasta passar de `max_bytes`, as exportações mais
+    antigas até caber. Os caminhos em `manter` e os temporários recentes
+    (exportações em andamento de outras sessões) não são removidos.
+    """
+    manter = {os.path.abspath(c) for c in manter}
+    agora = time.time()
+    arquivos = []
+    with os.scandir(pasta) as it:
+        for entrada in it:
+            if entrada.is_file():
+                info = entrada.stat()
+                arquivos.append((info.st_mtime, info.st_size, entrada.path))
+    arquivos.sort()
+    total = sum(tamanho for _, tamanho, _ in arquivos)
+    removidos = 0
+    for mtime, tamanho, caminho in arquivos:
+        antigo = agora - mtime > idade
+        excesso = total > max_bytes and not caminho.endswith(".tmp")
+        if os.path.abspath(caminho) in manter or not (antigo or excesso):
+            continue
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            pass  # já removido por outra sessão
+        total -= tamanho
+        removidos += 1
+    return removidos
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("saida", help="arquivo de saída; o formato vem da extensão")
+    p.add_argument("--fonte", default=FONTE)
+    p.add_argument("--cache-dir", default=CACHE_DIR)
+    p.add_argument("--inicio", help="primeira data de pedido (aaaa-mm-dd)")
+    p.add_argument("--fim", help="última data de pedido (aaaa-mm-dd)")
+    p.add_argument("--transportadora", nargs="+")
+    p.add_argument("--hub", nargs="+", dest="cidade_origem")
+    p.add_argument("--status", nargs="+", dest="status_entrega")
+    args = p.parse_args()
+
+    formato = "parquet" if args.saida.endswith(EXTENSOES["parquet"]) else "csv"
+    t0 = time.perf_counter()
+    frame = carregar_dataset(args.fonte, args.cache_dir)
+    datas = frame["data_pedido"]
+    filtros = {
+        dim: valores for dim in ("transportadora", "cidade_origem", "status_entrega")
+        if (valores := getattr(args, dim))
+    }
+    mascara = ExploradorPedidos(frame).mascara(
+        args.inicio or datas.min(), args.fim or datas.max(), **filtros,
+    )
+    n = exportar(frame, mascara, args.saida, formato)
+    print(f"{args.saida}: {n} pedidos em {time.perf_counter() - t0:.1f} s")
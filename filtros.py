@@ -0,0 +1,104 @@
+"""Motor de filtragem indexado para a barra lateral do dashboard."""
+import itertools
+
+import numpy as np
+import pandas as pd
+
+
+DIMENSOES_FILTRO = ("transportadora", "cidade_origem", "status_entrega")
+
+_versoes = itertools.count(1)
+
+
+class IndiceFiltro:
+    """Índice construído uma vez por carga: linhas ordenadas por data + bitmaps.
+
+    O período é resolvido por busca binária sobre a coluna de data ordenada e
+    cada valor das dimensões filtráveis tem um bitmap (np.packbits) com as
+    linhas em que aparece. A seleção devolve posições, sem copiar o frame.
+    """
+
+    def __init__(self, df, coluna_data="data_pedido", dimensoes=DIMENSOES_FILTRO):
+        if not df[coluna_data].is_monotonic_increasing:
+            df = df.sort_values(coluna_data, kind="stable")
+        self.frame = df.reset_index(drop=True)
+        self.versao = next(_versoes)
+        self._datas = self.frame[coluna_data].to_numpy()
+
+        self._bitmaps = {}
+        self._completa = {}
+        for dim in dimensoes:
+            col = self.frame[dim]
+            if not isinstance(col.dtype, pd.CategoricalDtype):
+                col = col.astype("category")
+            codes = col.cat.codes.to_numpy()
+            self._bitmaps[dim] = {
+                valor: np.packbits(codes == i)
+                for i, valor in enumerate(col.cat.categories)
+                if (codes == i).any()
+            }
+            # Sem nulos, selecionar todos os valores equivale a não filtrar
+            self._completa[dim] = not (codes < 0).any()
+
+    def __len__(self):
+        return len(self.frame)
+
+    def valores(self, dim):
+        """Valores presentes na dimensão, em ordem alfabética."""
+        return sorted(self._bitmaps[dim])
+
+    def intervalo(self, data_inicio, data_fim):
+        """Posições [lo, hi) do período, com data_fim inclusiva (dia inteiro)."""
+        inicio = np.datetime64(pd.Timestamp(data_inicio))
+        fim    = np.datetime64(pd.Timestamp(data_fim) + pd.Timedelta(days=1))
+        lo = int(np.searchsorted(self._datas, inicio, side="left"))
+        hi = int(np.searchsorted(self._datas, fim, side="left"))
+        return lo, max(lo, hi)
+
+    def assinatura(self, data_inicio, data_fim, **filtros):
+        """Chave normalizada da seleção, estável entre reruns e sessões.
+
+        O período vira o intervalo de posições que ele cobre e cada dimensão
+        vira None (todos os valores) ou a tupla ordenada dos valores presentes.
+        """
+        norm = []
+        for dim, selecionados in sorted(filtros.items()):
+            bitmaps = self._bitmaps[dim]
+            sel = set(selecionados).intersection(bitmaps)
+            if self._completa[dim] and len(sel) == len(bitmaps):
+                norm.append((dim, None))
+            else:
+                norm.append((dim, tuple(sorted(sel))))
+        return (self.versao, self.intervalo(data_inicio, data_fim), tuple(norm))
+
+    def selecionar(self, data_inicio, data_fim, **filtros):
+        """Posições (ordenadas) das linhas que atendem ao período e aos filtros.
+
+        Cada filtro é `dimensão=valores selecionados`. Retorna um `slice` quando
+        nenhuma dimensão restringe o período, ou um array de posições.
+        """
+        lo, hi = self.intervalo(data_inicio, data_fim)
+        b0, b1 = lo // 8, (hi + 7) // 8
+
+        acc = None
+        for dim, selecionados in filtros.items():
+            bitmaps = self._bitmaps[dim]
+            sel = set(selecionados)
+            if self._completa[dim] and sel.issuperset(bitmaps):
+                continue
+            uniao = np.zeros(b1 - b0, dtype=np.uint8)
+            for valor in sel.intersection(bitmaps):
+                uniao |= bitmaps[valor][b0:b1]
+            acc = uniao if acc is None else (acc & uniao)
+
+        if acc is None:
+            return slice(lo, hi)
+        bits = np.unpackbits(acc, count=(b1 - b0) * 8)[lo - b0 * 8 : hi - b0 * 8]
+        return np.flatnonzero(bits) + lo
+
+    def filtrar(self, data_inicio, data_fim, **filtros):
+        """Frame filtrado: fatia do frame ordenado ou `take` das posições."""
+        pos = self.selecionar(data_inicio, data_fim, **filtros)
+        if isinstance(pos, slice):
+            return self.frame.iloc[pos]
+        return self.frame.take(pos)
@@ -0,0 +1,139 @@
+"""Coordenadas dos hubs e geração vetorizada de coordenadas simuladas de destino."""
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from dados import CACHE_DIR, gravar_json
+
+
+HUB_COORDS = {
+    "São Paulo":      {"lat": -23.55, "lon": -46.63},
+    "Curitiba":       {"lat": -25.43, "lon": -49.27},
+    "Belo Horizonte": {"lat": -19.92, "lon": -43.93},
+    "Salvador":       {"lat": -12.97, "lon": -38.51},
+    "Recife":         {"lat":  -8.05, "lon": -34.88},
+}
+HUB_PADRAO = {"lat": -15.0, "lon": -47.0}
+
+# Fronteira LESTE (costa) e OESTE (divisa) simplificadas (lat → lon)
+_COAST_EAST = np.array([
+    (-33.0, -52.5), (-30.0, -50.2), (-28.0, -48.6), (-26.0, -48.5),
+    (-25.3, -48.3), (-24.0, -46.3), (-23.0, -43.5), (-22.0, -41.0),
+    (-20.0, -40.0), (-18.0, -39.5), (-16.0, -39.0), (-14.0, -38.9),
+    (-13.0, -38.5), (-10.0, -36.5), (-8.0,  -34.9), (-5.0,  -35.2),
+    (-3.0,  -38.5), (-1.0,  -44.0), (0.0,   -48.0), (2.0,   -50.0),
+    (4.5,   -51.5),
+])
+_BORDER_WEST = np.array([
+    (-33.0, -57.5), (-30.0, -57.0), (-28.0, -56.0), (-26.0, -54.5),
+    (-24.0, -54.5), (-22.0, -55.0), (-20.0, -57.5), (-18.0, -58.0),
+    (-16.0, -59.0), (-14.0, -60.0), (-12.0, -62.0), (-10.0, -65.5),
+    (-8.0,  -67.0), (-6.0,  -69.5), (-4.0,  -70.0), (-2.0,  -70.0),
+    (0.0,   -69.5), (2.0,   -64.0), (4.5,   -60.5),
+])
+
+# Tabela de consulta por cidade: (h % 1000, h % 5000, h2 % 10000, h2 % 5000).
+# Persistida ao lado dos snapshots: cada cidade é hasheada uma única vez, não
+# uma vez por processo.
+RESIDUOS_PATH = os.path.join(CACHE_DIR, "mapa.residuos.json")
+_RESIDUOS = None
+_LOCK_RESIDUOS = threading.Lock()
+
+
+def _interp_border(lat, border_pts):
+    """Interpola a longitude da fronteira para um array de latitudes.
+
+    Mesmo resultado (bit a bit) da interpolação segmento a segmento: abaixo do
+    primeiro ponto ou acima do último, usa a longitude da extremidade.
+    """
+    lats, lons = border_pts[:, 0], border_pts[:, 1]
+    i = np.clip(np.searchsorted(lats, lat, side="left") - 1, 0, len(lats) - 2)
+    t = (lat - lats[i]) / (lats[i + 1] - lats[i])
+    out = lons[i] + t * (lons[i + 1] - lons[i])
+    out = np.where(lat <= lats[0], lons[0], out)
+    return np.where(lat >= lats[-1], lons[-1], out)
+
+
+def _carregar_residuos():
+    """Tabela de resíduos gravada em `RESIDUOS_PATH` (vazia se ausente ou ilegível)."""
+    try:
+        with open(RESIDUOS_PATH, encoding="utf-8") as f:
+            return {c: tuple(r) for c, r in json.load(f).items()}
+    except (OSError, ValueError, TypeError, AttributeError):
+        return {}
+
+
+def _residuos(cidades):
+    """Matriz (n, 4) de resíduos do hash MD5 de cada cidade, via tabela de consulta.
+
+    Só as cidades ausentes da tabela são hasheadas; a tabela é regravada
+    quando ganha cidades novas.
+    """
+    global _RESIDUOS
+    codes, unicas = pd.factorize(np.asarray(cidades, dtype=object))
+    with _LOCK_RESIDUOS:
+        if _RESIDUOS is None:
+            _RESIDUOS = _carregar_residuos()
+        novas = [c for c in unicas if c not in _RESIDUOS]
+        for c in novas:
+            h  = int(hashlib.md5(c.encode()).hexdigest(), 16)
+            h2 = int(hashlib.md5((c + "_v2").encode()).hexdigest(), 16)
+            _RESIDUOS[c] = (h % 1000, h % 5000, h2 % 10000, h2 % 5000)
+        if novas:
+            try:
+                os.makedirs(CACHE_DIR, exist_ok=True)
+                gravar_json(RESIDUOS_PATH, _RESIDUOS)
+            except OSError:
+                pass
+        tabela = np.array([_RESIDUOS[c] for c in unicas], dtype=np.float64).reshape(-1, 4)
+    return tabela[codes]
+
+
+def coords_hub(origens):
+    """Arrays (lat, lon) das coordenadas reais dos hubs."""
+    codes, unicas = pd.factorize(np.asarray(origens, dtype=object))
+    tabela = np.array(
+        [(HUB_COORDS.get(o, HUB_PADRAO)["lat"], HUB_COORDS.get(o, HUB_PADRAO)["lon"]) for o in unicas],
+        dtype=np.float64,
+    ).reshape(-1, 2)
+    return tabela[codes, 0], tabela[codes, 1]
+
+
+def coords_destino(destinos, origens):
+    """Gera lat/lon simuladas para os destinos, dentro do território brasileiro.
+
+    Determinístico: cada destino é deslocado a partir do seu hub por um hash
+    do nome da cidade e rebatido para dentro das fronteiras leste/oeste.
+    """
+    r = _residuos(destinos)
+    hub_lat, hub_lon = coords_hub(origens)
+
+    # Espalhar: lat ±5 graus, lon até -10 graus para oeste
+    lat = hub_lat + (r[:, 0] / 1000 - 0.5) * 10.0
+    lon = hub_lon - (r[:, 2] / 10000 * 9.0 + 1.0)
+    lat = np.clip(lat, -32.5, 4.0)
+
+    east_limit = _interp_border(lat, _COAST_EAST) - 0.8
+    west_limit = _interp_border(lat, _BORDER_WEST) + 0.8
+    largura = east_limit - west_limit
+
+    lon = np.where(
+        lon > east_limit, west_limit + (r[:, 1] / 5000) * largura,
+        np.where(lon < west_limit, west_limit + (r[:, 3] / 5000) * largura, lon),
+    )
+    return lat, lon
+
+
+def com_coordenadas(t):
+    """Tabelas da aba Mapa com as coordenadas de origem e destino das rotas."""
+    routes = t["routes"].copy()
+    routes["dest_lat"], routes["dest_lon"] = coords_destino(routes["cidade_destino"], routes["cidade_origem"])
+    routes["orig_lat"], routes["orig_lon"] = coords_hub(routes["cidade_origem"])
+
+    hub_map = t["hub_map"].copy()
+    hub_map["lat"], hub_map["lon"] = coords_hub(hub_map["cidade_origem"])
+    return {**t, "routes": routes, "hub_map": hub_map}
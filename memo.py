@@ -0,0 +1,109 @@
+"""Cache LRU em memória para resultados derivados da seleção de filtros."""
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+# Orçamento padrão do cache compartilhado pelas sessões do app
+MAX_BYTES = 256 * 2 ** 20
+
+# Listas mais longas que isto são estimadas por uma amostra dos itens
+AMOSTRA_ITENS = 64
+
+
+def tamanho(valor):
+    """Bytes estimados de uma entrada: buffers de frames e arrays, soma dos itens de coleções.
+
+    Listas longas (p.ex. textos de hover) contam pela média de uma amostra de
+    itens espaçados. Figuras do Plotly contam pelo dicionário de traços e
+    layout. Objetos de outros tipos contam só o próprio `sys.getsizeof`.
+    """
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(index=True).sum())
+    if isinstance(valor, (pd.Series, pd.Index)):
+        return int(valor.memory_usage())
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamanho(v) for v in valor.values())
+    if isinstance(valor, (list, tuple)):
+        passo = max(1, len(valor) // AMOSTRA_ITENS)
+        amostra = valor[::passo]
+        media = sum(tamanho(v) for v in amostra) / len(amostra) if amostra else 0
+        return sys.getsizeof(valor) + int(media * len(valor))
+    if hasattr(valor, "to_plotly_json"):
+        return tamanho(valor.to_plotly_json())
+    return sys.getsizeof(valor)
+
+
+class CacheLRU:
+    """Cache limitado por número de entradas e por bytes, com despejo LRU e contadores.
+
+    O tamanho de cada entrada é estimado uma vez, ao armazená-la (`tamanho`);
+    uma entrada maior que o orçamento inteiro é devolvida sem ser guardada.
+
+    Compartilhado entre sessões do Streamlit (threads), por isso protegido por
+    lock. O cálculo de uma entrada ausente roda fora do lock.
+    """
+
+    def __init__(self, maxsize=128, maxbytes=MAX_BYTES):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+        self._dados = OrderedDict()
+        self._tamanhos = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._dados)
+
+    def __contains__(self, chave):
+        return chave in self._dados
+
+    def obter(self, chave, calcular):
+        """Retorna o valor da chave, calculando e armazenando em caso de falta."""
+        with self._lock:
+            if chave in self._dados:
+                self._dados.move_to_end(chave)
+                self.hits += 1
+                return self._dados[chave]
+            self.misses += 1
+
+        valor = calcular()
+        n = tamanho(valor)
+        if n > self.maxbytes:
+            return valor
+        with self._lock:
+            if chave in self._dados:
+                self.bytes -= self._tamanhos[chave]
+            self._dados[chave] = valor
+            self._tamanhos[chave] = n
+            self.bytes += n
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.maxsize or self.bytes > self.maxbytes:
+                antiga, _ = self._dados.popitem(last=False)
+                self.bytes -= self._tamanhos.pop(antiga)
+        return valor
+
+    def limpar(self):
+        with self._lock:
+            self._dados.clear()
+            self._tamanhos.clear()
+            self.bytes = 0
+            self.hits = self.misses = 0
+
+    def estatisticas(self):
+        """Entradas, bytes estimados, acertos, faltas e taxa de acerto."""
+        total = self.hits + self.misses
+        return {
+            "entradas": len(self._dados),
+            "bytes":    self.bytes,
+            "hits":     self.hits,
+            "misses":   self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
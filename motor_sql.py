@@ -0,0 +1,216 @@
+"""Backend SQL embarcado (DuckDB ou SQLite) para filtros e agregações do cubo."""
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+from agregacoes import DIMENSOES, MEDIDAS, construir_cubo, derivar, kpis_de_somas
+from dados import (
+    CACHE_DIR, CATEGORICAS, FONTE, assinatura_arquivo, enriquecer, gravar_json,
+    ler_csv, nome_cache, snapshot_valido,
+)
+
+
+# "pandas" (padrão) mantém o cubo em memória; "duckdb" ou "sqlite" consultam
+# um banco em disco e trazem para o Python só os resultados agregados
+MOTOR = os.environ.get("FCD_MOTOR", "pandas")
+
+# Linhas do CSV por bloco na construção do banco (memória constante)
+BLOCO = 500_000
+
+# As consultas agrupam por rota, então o cubo do banco mantém o destino
+# (no banco, o tamanho do cubo não pesa na memória do processo)
+DIMENSOES_SQL = (*DIMENSOES, "cidade_destino")
+
+_SOMAS = ", ".join(f"CAST(SUM({m}) AS BIGINT) AS {m}" for m in MEDIDAS)
+
+
+class _SQLite:
+    nome = "sqlite"
+
+    def __init__(self, caminho, somente_leitura=False):
+        uri = f"file:{caminho}?mode=ro" if somente_leitura else f"file:{caminho}"
+        self.con = sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+    def consultar(self, sql, params=()):
+        return pd.read_sql_query(sql, self.con, params=list(params))
+
+    def executar(self, sql):
+        self.con.execute(sql)
+        self.con.commit()
+
+    def anexar(self, tabela, df):
+        df.to_sql(tabela, self.con, if_exists="append", index=False)
+
+    def fechar(self):
+        self.con.close()
+
+
+class _DuckDB:
+    nome = "duckdb"
+
+    def __init__(self, caminho, somente_leitura=False):
+        import duckdb
+        self.con = duckdb.connect(caminho, read_only=somente_leitura)
+
+    def consultar(self, sql, params=()):
+        return self.con.execute(sql, list(params)).df()
+
+    def executar(self, sql):
+        self.con.execute(sql)
+
+    def anexar(self, tabela, df):
+        self.con.register("_bloco", df)
+        self.con.execute(f"CREATE TABLE IF NOT EXISTS {tabela} AS SELECT * FROM _bloco LIMIT 0")
+        self.con.execute(f"INSERT INTO {tabela} SELECT * FROM _bloco")
+        self.con.unregister("_bloco")
+
+    def fechar(self):
+        self.con.close()
+
+
+def _conector(motor):
+    """Classe de conexão do motor pedido; sem o pacote duckdb, cai para SQLite."""
+    if motor == "duckdb":
+        try:
+            import duckdb  # noqa: F401
+            return _DuckDB
+        except ImportError:
+            pass
+    return _SQLite
+
+
+def _bloco_sql(cubo):
+    """Cubo parcial com chaves em texto (datas ISO), no formato da tabela."""
+    return cubo.assign(
+        data_pedido=cubo["data_pedido"].dt.strftime("%Y-%m-%d"),
+        mes=cubo["mes"].dt.strftime("%Y-%m-%d"),
+        **{c: cubo[c].astype(str) for c in CATEGORICAS},
+    )
+
+
+def construir_banco(fonte=FONTE, motor=MOTOR, cache_dir=CACHE_DIR):
+    """Cria (ou reaproveita) o banco com o cubo da fonte; retorna (caminho, conector).
+
+    O CSV é lido em blocos: cada bloco vira um cubo parcial e a soma final por
+    célula é feita pelo próprio motor, então a memória não cresce com a base.
+    O banco só é refeito quando a assinatura do CSV muda.
+    """
+    conector = _conector(motor)
+    caminho = os.path.join(cache_dir, f"{nome_cache(fonte)}.{conector.nome}")
+    meta_path = caminho + ".meta.json"
+    if os.path.exists(caminho) and snapshot_valido(fonte, meta_path):
+        return caminho, conector
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = caminho + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    meta = assinatura_arquivo(fonte)
+    con = conector(tmp)
+    try:
+        for bloco in ler_csv(fonte, chunksize=BLOCO):
+            con.anexar("parcial", _bloco_sql(construir_cubo(enriquecer(bloco), DIMENSOES_SQL)))
+        dims = ", ".join(DIMENSOES_SQL + ("mes",))
+        con.executar(
+            f"CREATE TABLE cubo AS SELECT {dims}, {_SOMAS} FROM parcial "
+            f"GROUP BY {dims} ORDER BY data_pedido"
+        )
+        con.executar("DROP TABLE parcial")
+        con.executar("CREATE INDEX idx_cubo_data ON cubo (data_pedido)")
+    finally:
+        con.fechar()
+    os.replace(tmp, caminho)
+    gravar_json(meta_path, meta)
+    return caminho, conector
+
+
+class MotorSQL:
+    """Consultas do dashboard resolvidas no banco embarcado.
+
+    Mesma interface de filtros do IndiceFiltro (`valores`, `assinatura`), mais
+    `kpis` e `resumir_varios` que recebem o período e os filtros e devolvem só
+    os agregados. Período e dimensões viram o WHERE; cada conjunto de chaves
+    das abas vira um GROUP BY.
+    """
+
+    def __init__(self, fonte=FONTE, motor=MOTOR, cache_dir=CACHE_DIR):
+        caminho, conector = construir_banco(fonte, motor, cache_dir)
+        self.motor = conector.nome
+        self.versao = (self.motor, os.stat(caminho).st_mtime_ns)
+        self._con = conector(caminho, somente_leitura=True)
+        self._lock = threading.Lock()
+
+        self._valores = {
+            dim: self._consultar(f"SELECT DISTINCT {dim} FROM cubo ORDER BY {dim}")[dim].tolist()
+            for dim in CATEGORICAS
+        }
+        r = self._consultar(
+            "SELECT MIN(data_pedido) AS ini, MAX(data_pedido) AS fim, "
+            "CAST(SUM(pedidos) AS BIGINT) AS pedidos FROM cubo"
+        ).iloc[0]
+        self.data_min, self.data_max = pd.Timestamp(r["ini"]), pd.Timestamp(r["fim"])
+        self.registros = int(r["pedidos"])
+
+    def _consultar(self, sql, params=()):
+        with self._lock:
+            return self._con.consultar(sql, params)
+
+    def valores(self, dim):
+        """Valores presentes na dimensão, em ordem alfabética."""
+        return list(self._valores[dim])
+
+    def _normalizar(self, filtros):
+        norm = []
+        for dim, selecionados in sorted(filtros.items()):
+            sel = set(selecionados).intersection(self._valores[dim])
+            norm.append((dim, None if len(sel) == len(self._valores[dim]) else tuple(sorted(sel))))
+        return tuple(norm)
+
+    def _periodo(self, data_inicio, data_fim):
+        return (pd.Timestamp(data_inicio).strftime("%Y-%m-%d"),
+                pd.Timestamp(data_fim).strftime("%Y-%m-%d"))
+
+    def assinatura(self, data_inicio, data_fim, **filtros):
+        """Chave normalizada da seleção, estável entre reruns e sessões."""
+        return (self.versao, self._periodo(data_inicio, data_fim), self._normalizar(filtros))
+
+    def _where(self, data_inicio, data_fim, filtros):
+        condicoes = ["data_pedido BETWEEN ? AND ?"]
+        params = list(self._periodo(data_inicio, data_fim))
+        for dim, sel in self._normalizar(filtros):
+            if sel is None:
+                continue
+            if not sel:
+                return "WHERE 1 = 0", []
+            condicoes.append(f"{dim} IN ({', '.join('?' * len(sel))})")
+            params.extend(sel)
+        return "WHERE " + " AND ".join(condicoes), params
+
+    def kpis(self, data_inicio, data_fim, **filtros):
+        """KPIs da seleção, ou None se ela estiver vazia."""
+        where, params = self._where(data_inicio, data_fim, filtros)
+        r = self._consultar(
+            f"SELECT {_SOMAS}, COUNT(DISTINCT cidade_destino) AS destinos FROM cubo {where}", params,
+        ).iloc[0]
+        if pd.isna(r["pedidos"]) or r["pedidos"] == 0:
+            return None
+        return kpis_de_somas(r, r["destinos"])
+
+    def resumir_varios(self, conjuntos, data_inicio, data_fim, **filtros):
+        """Como agregacoes.resumir_varios, com um GROUP BY por conjunto de chaves."""
+        where, params = self._where(data_inicio, data_fim, filtros)
+        resultado = {}
+        for chaves in map(tuple, conjuntos):
+            cols = ", ".join(chaves)
+            t = self._consultar(
+                f"SELECT {cols}, {_SOMAS} FROM cubo {where} GROUP BY {cols} ORDER BY {cols}", params,
+            )
+            for c in chaves:
+                if c == "mes":
+                    t[c] = pd.to_datetime(t[c])
+                else:
+                    t[c] = pd.Categorical(t[c], categories=self._valores[c])
+            resultado[chaves] = derivar(t)
+        return resultado
@@ -0,0 +1,109 @@
+"""Índice de partições (um arquivo por mês) de uma fonte em diretório."""
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+from dados import CACHE_DIR, CATEGORICAS, FONTE, carregar_particao, gravar_json, listar_particoes, nome_cache
+
+
+# Intervalo mínimo, em segundos, entre duas varreduras do diretório pelo app
+INTERVALO_INDEXACAO = 5.0
+
+class DatasetParticionado:
+    """Metadados de cada partição, para ler só as que cobrem o período pedido.
+
+    Para cada arquivo do diretório guarda o período (primeira e última
+    data_pedido), o número de linhas e os valores das dimensões, numa tabela
+    persistida em `<cache>/<pasta>.<hash>.particoes.json`. Uma partição só é lida
+    para indexação quando é nova ou mudou (tamanho ou mtime).
+    """
+
+    def __init__(self, pasta=FONTE, cache_dir=CACHE_DIR):
+        self.pasta = pasta
+        self.cache_dir = cache_dir
+        self._meta_path = os.path.join(cache_dir, f"{nome_cache(pasta)}.particoes.json")
+        self._lock = threading.Lock()
+        self._indexado_em = None
+        try:
+            with open(self._meta_path, encoding="utf-8") as f:
+                self._particoes = json.load(f)
+        except (OSError, ValueError):
+            self._particoes = {}
+        self.indexar()
+
+    def indexar(self, intervalo=0.0):
+        """Atualiza os metadados das partições novas ou alteradas.
+
+        Com `intervalo`, não faz nada se a última varredura (que consulta o
+        tamanho e o mtime de cada partição) foi há menos de `intervalo` segundos.
+        """
+        with self._lock:
+            agora = time.monotonic()
+            if self._indexado_em is not None and agora - self._indexado_em < intervalo:
+                return
+            self._indexado_em = agora
+            mudou = False
+            atuais = {os.path.basename(p): p for p in listar_particoes(self.pasta)}
+            for nome in set(self._particoes) - set(atuais):
+                del self._particoes[nome]
+                mudou = True
+            for nome, path in atuais.items():
+                st_arq = os.stat(path)
+                meta = self._particoes.get(nome)
+                if meta and meta["tamanho"] == st_arq.st_size and meta["mtime_ns"] == st_arq.st_mtime_ns:
+                    continue
+                df = carregar_particao(path, self.cache_dir)
+                vazio = df.empty
+                self._particoes[nome] = {
+                    "tamanho":  st_arq.st_size,
+                    "mtime_ns": st_arq.st_mtime_ns,
+                    "inicio":   None if vazio else df["data_pedido"].min().date().isoformat(),
+                    "fim":      None if vazio else df["data_pedido"].max().date().isoformat(),
+                    "linhas":   len(df),
+                    "valores":  {dim: sorted(map(str, df[dim].dropna().unique())) for dim in CATEGORICAS},
+                }
+                mudou = True
+            if mudou:
+                try:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    gravar_json(self._meta_path, self._particoes)
+                except OSError:
+                    pass
+
+    def _validas(self):
+        return [m for m in self._particoes.values() if m["linhas"]]
+
+    def periodo(self):
+        """Primeira e última data de pedido entre todas as partições."""
+        validas = self._validas()
+        if not validas:
+            raise FileNotFoundError(f"Nenhuma partição com dados em {self.pasta}")
+        return (pd.Timestamp(min(m["inicio"] for m in validas)),
+                pd.Timestamp(max(m["fim"] for m in validas)))
+
+    def registros(self):
+        return sum(m["linhas"] for m in self._particoes.values())
+
+    def valores(self, dim):
+        """Valores da dimensão em todas as partições, em ordem alfabética."""
+        return sorted(set().union(*(m["valores"][dim] for m in self._validas())))
+
+    def assinatura(self, arquivos):
+        """Tamanho e mtime indexados de cada partição: mudam quando alguma é reescrita ou cresce."""
+        return tuple(
+            (self._particoes[n]["tamanho"], self._particoes[n]["mtime_ns"])
+            for n in map(os.path.basename, arquivos)
+        )
+
+    def arquivos(self, data_inicio, data_fim):
+        """Partições cujo período intercepta [data_inicio, data_fim]."""
+        inicio = pd.Timestamp(data_inicio).date().isoformat()
+        fim = pd.Timestamp(data_fim).date().isoformat()
+        return [
+            os.path.join(self.pasta, nome)
+            for nome, m in sorted(self._particoes.items())
+            if m["linhas"] and m["inicio"] <= fim and m["fim"] >= inicio
+        ]
@@ -0,0 +1,183 @@
+"""Consultas de pedidos (linhas) para as listagens paginadas do dashboard."""
+import numpy as np
+import pandas as pd
+
+
+TAMANHO_PAGINA = 50
+
+# Colunas exibidas nas listagens, com os rótulos da interface
+COLUNAS_PEDIDOS = {
+    "pedido_id":           "Pedido",
+    "data_pedido":         "Data do Pedido",
+    "data_entrega":        "Data de Entrega",
+    "transportadora":      "Transportadora",
+    "cidade_origem":       "Hub",
+    "cidade_destino":      "Destino",
+    "prazo_estimado_dias": "Prazo Estimado (dias)",
+    "prazo_real_dias":     "Prazo Real (dias)",
+    "atraso_dias":         "Atraso (dias)",
+    "custo_transporte":    "Custo (R$)",
+    "status_entrega":      "Status",
+}
+
+
+class IndiceGrupos:
+    """Posições das linhas de cada combinação de chaves, construído uma vez por carga.
+
+    As posições ficam num único array ordenado pela chave combinada (códigos
+    das categorias), com o início e o fim de cada grupo: obter as linhas de um
+    grupo é uma busca binária e uma fatia, sem percorrer o frame.
+    """
+
+    def __init__(self, frame, chaves):
+        self.chaves = tuple(chaves)
+        self._categorias = []
+        combinada = np.zeros(len(frame), dtype="int64")
+        validas = np.ones(len(frame), dtype=bool)
+        for c in self.chaves:
+            col = frame[c]
+            if not isinstance(col.dtype, pd.CategoricalDtype):
+                col = col.astype("category")
+            codes = col.array.codes
+            self._categorias.append(col.cat.categories)
+            combinada = combinada * len(col.cat.categories) + codes
+            validas &= codes >= 0
+
+        tipo = "int32" if len(frame) < 2 ** 31 else "int64"
+        ordem = np.flatnonzero(validas)
+        ordem = ordem[np.argsort(combinada[ordem], kind="stable")].astype(tipo)
+        self._grupos, self._inicio = np.unique(combinada[ordem], return_index=True)
+        self._fim = np.append(self._inicio[1:], len(ordem))
+        self._ordem = ordem
+
+    def posicoes(self, *valores):
+        """Posições (em ordem de linha) das linhas do grupo; vazio se não existir."""
+        chave = 0
+        for cats, valor in zip(self._categorias, valores):
+            i = cats.get_indexer([valor])[0]
+            if i < 0:
+                return self._ordem[:0]
+            chave = chave * len(cats) + i
+        g = np.searchsorted(self._grupos, chave)
+        if g == len(self._grupos) or self._grupos[g] != chave:
+            return self._ordem[:0]
+        return self._ordem[self._inicio[g]:self._fim[g]]
+
+
+def filtrar_posicoes(frame, pos, data_inicio, data_fim, **filtros):
+    """Posições de `pos` que atendem ao período e aos filtros da barra lateral."""
+    sub = frame.take(pos)
+    datas = sub["data_pedido"]
+    manter = (
+        (datas >= pd.Timestamp(data_inicio))
+        & (datas < pd.Timestamp(data_fim) + pd.Timedelta(days=1))
+    ).to_numpy()
+    for dim, selecionados in filtros.items():
+        manter = manter & sub[dim].isin(selecionados).to_numpy()
+    return pos[manter]
+
+
+def ordenar_posicoes(frame, pos, coluna, crescente=True):
+    """Posições reordenadas pela coluna (estável: empates mantêm a ordem das linhas)."""
+    valores = frame[coluna].take(pos)
+    ordem = valores.reset_index(drop=True).sort_values(ascending=crescente, kind="stable").index
+    return pos[ordem.to_numpy()]
+
+
+def pagina(frame, pos, numero, tamanho):
+    """Linhas da página `numero` (a partir de 1), com os rótulos da interface."""
+    fatia = pos[(numero - 1) * tamanho : numero * tamanho]
+    df = frame.take(fatia)[list(COLUNAS_PEDIDOS)].reset_index(drop=True)
+    df["data_pedido"]      = df["data_pedido"].dt.date
+    df["data_entrega"]     = df["data_entrega"].dt.date
+    df["custo_transporte"] = df["custo_transporte"].astype("float64").round(2)
+    return df.rename(columns=COLUNAS_PEDIDOS)
+
+
+def _normalizar(textos):
+    """Minúsculas e sem acentos, para a busca textual."""
+    return (
+        pd.Series(textos, dtype="str").str.lower()
+        .str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii")
+    )
+
+
+class ExploradorPedidos:
+    """Listagem de todos os pedidos com filtro, busca, ordenação e paginação.
+
+    Cada coluna ordenável tem uma permutação (argsort estável de todas as
+    linhas) calculada na primeira vez em que é pedida; uma página da seleção
+    ordenada sai percorrendo a permutação, em blocos, só até completá-la,
+    sem ordenar de novo nem materializar a seleção inteira. Filtros e busca
+    viram máscaras por tabela de consulta sobre os códigos das categorias.
+    """
+
+    ORDENAVEIS = (
+        "data_pedido", "data_entrega", "atraso_dias", "custo_transporte",
+        "prazo_real_dias", "prazo_estimado_dias", "pedido_id",
+    )
+
+    def __init__(self, frame):
+        self.frame = frame
+        self._permutacoes = {}
+
+    def permutacao(self, coluna):
+        """Posições de todas as linhas em ordem crescente da coluna."""
+        if coluna not in self._permutacoes:
+            valores = self.frame[coluna].to_numpy()
+            tipo = "int32" if len(valores) < 2 ** 31 else "int64"
+            self._permutacoes[coluna] = np.argsort(valores, kind="stable").astype(tipo)
+        return self._permutacoes[coluna]
+
+    def _pertence(self, coluna, aceitos):
+        col = self.frame[coluna]
+        tabela = np.append(col.cat.categories.isin(aceitos), False)  # código -1 (nulo) → False
+        return tabela[col.array.codes]
+
+    def mascara(self, data_inicio, data_fim, busca="", **filtros):
+        """Linhas no período, nos filtros e, com `busca`, com o texto na origem ou no destino."""
+        datas = self.frame["data_pedido"].to_numpy()
+        manter = (
+            (datas >= np.datetime64(pd.Timestamp(data_inicio)))
+            & (datas < np.datetime64(pd.Timestamp(data_fim) + pd.Timedelta(days=1)))
+        )
+        for dim, selecionados in filtros.items():
+            manter &= self._pertence(dim, list(selecionados))
+        termo = _normalizar([busca.strip()])[0]
+        if termo:
+            achados = np.zeros(len(manter), dtype=bool)
+            for dim in ("cidade_origem", "cidade_destino"):
+                cats = self.frame[dim].cat.categories
+                achados |= self._pertence(dim, cats[_normalizar(cats).str.contains(termo, regex=False).to_numpy()])
+            manter &= achados
+        return manter
+
+    def fatia(self, mascara, coluna, crescente=True, inicio=0, tamanho=TAMANHO_PAGINA, cursor=(0, 0)):
+        """Posições das linhas [inicio, inicio + tamanho) da máscara em ordem da coluna, e o cursor do fim.
+
+        Um cursor é (posição na permutação, linhas da máscara antes dela): a
+        busca começa em `cursor`, que deve ter no máximo `inicio` linhas antes
+        de si, e o cursor devolvido permite continuar na fatia seguinte sem
+        recomeçar do início da permutação. Em ordem decrescente a permutação
+        é percorrida de trás para frente.
+        """
+        perm = self.permutacao(coluna)
+        if not crescente:
+            perm = perm[::-1]
+        a, vistos = cursor
+        partes = [perm[:0]]
+        faltam = tamanho
+        bloco = 4096
+        while faltam > 0 and a < len(perm):
+            trecho = perm[a:a + bloco]
+            achados = np.flatnonzero(mascara[trecho])
+            pular = max(inicio - vistos, 0)
+            usados = achados[pular:pular + faltam]
+            partes.append(trecho[usados])
+            faltam -= len(usados)
+            if faltam == 0:
+                return np.concatenate(partes), (a + int(usados[-1]) + 1, vistos + pular + len(usados))
+            vistos += len(achados)
+            a += len(trecho)
+            bloco = min(bloco * 2, 1 << 20)  # seleções esparsas: blocos cada vez maiores
+        return np.concatenate(partes), (a, vistos)
@@ -0,0 +1,54 @@
+"""Medições por seção de um rerun do dashboard (modo diagnóstico)."""
+import time
+
+import pandas as pd
+
+
+class Perfil:
+    """Registra, em sequência, as seções nomeadas de uma execução do script.
+
+    Cada seção vai do fim da anterior até a chamada de `marcar`, então basta
+    marcar o fim de cada bloco (KPIs, cada gráfico de cada aba) sem reindentar
+    o código. Consultas ao cache LRU feitas dentro da seção são contadas como
+    acertos/faltas; o tamanho do JSON das figuras só é calculado com `ativo`.
+    """
+
+    def __init__(self, ativo=False):
+        self.ativo = ativo
+        self.secoes = []
+        self._inicio = self._t = time.perf_counter()
+        self._hits = self._misses = 0
+
+    def cache(self, acerto):
+        """Conta uma consulta ao cache na seção corrente."""
+        if acerto:
+            self._hits += 1
+        else:
+            self._misses += 1
+
+    def marcar(self, secao, linhas=None, figura=None, envio=None):
+        """Fecha a seção corrente com o nome, as linhas processadas e a figura."""
+        agora = time.perf_counter()
+        self.secoes.append({
+            "seção":        secao,
+            "tempo_ms":     (agora - self._t) * 1000,
+            "envio_ms":     envio * 1000 if envio is not None else None,
+            "linhas":       linhas,
+            "cache_hits":   self._hits,
+            "cache_misses": self._misses,
+            "figura_kb":    len(figura.to_json()) / 1024 if self.ativo and figura is not None else None,
+        })
+        self._hits = self._misses = 0
+        self._t = time.perf_counter()  # o cálculo do JSON não entra na próxima seção
+
+    def tabela(self):
+        """Seções do rerun, com uma linha final de total."""
+        df = pd.DataFrame(self.secoes)
+        total = {
+            "seção":        "Total do rerun",
+            "tempo_ms":     (time.perf_counter() - self._inicio) * 1000,
+            "cache_hits":   df["cache_hits"].sum() if len(df) else 0,
+            "cache_misses": df["cache_misses"].sum() if len(df) else 0,
+            "figura_kb":    df["figura_kb"].sum() if len(df) else None,
+        }
+        return pd.concat([df, pd.DataFrame([total])], ignore_index=True)
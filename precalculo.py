@@ -0,0 +1,111 @@
+"""Pré-cálculo, fora do app, dos KPIs e tabelas das seleções mais comuns.
+
+Uso: python precalculo.py [--fonte FCD_logistica.csv]
+
+Grava em .cache/precalculo/ os resultados da seleção padrão (tudo marcado,
+período completo) e das seleções de um único hub ou de uma única
+transportadora. O app os serve diretamente quando os filtros coincidem,
+desde que o CSV seja o mesmo usado no pré-cálculo.
+"""
+import argparse
+import os
+import pickle
+import time
+
+from agregacoes import (
+    CHAVES_CUBO, CHAVES_ROTAS, construir_cubo, kpis, resumir_varios,
+    tabelas_custos, tabelas_decisao, tabelas_mapa, tabelas_performance,
+)
+from dados import CACHE_DIR, FONTE, assinatura_arquivo, carregar_dataset, gravar_json, nome_cache, snapshot_valido
+from filtros import DIMENSOES_FILTRO, IndiceFiltro
+from mapa import com_coordenadas
+from rotas import CuboRotas
+
+
+# Incrementar quando o formato ou o cálculo dos resultados mudar
+PRECALCULO_VERSAO = 1
+
+
+def _caminhos(fonte, cache_dir):
+    base = nome_cache(fonte)
+    pasta = os.path.join(cache_dir, "precalculo")
+    arquivo = os.path.join(pasta, f"{base}.v{PRECALCULO_VERSAO}.pkl")
+    return arquivo, arquivo + ".meta.json"
+
+
+def chave_selecao(data_inicio, data_fim, filtros_norm):
+    """Chave de uma seleção: período em ISO e dimensões normalizadas da assinatura."""
+    return (data_inicio.isoformat(), data_fim.isoformat(), filtros_norm)
+
+
+def combinacoes(indice):
+    """Seleções pré-calculadas: padrão, um hub por vez e uma transportadora por vez."""
+    todos = {dim: indice.valores(dim) for dim in DIMENSOES_FILTRO}
+    yield todos
+    for dim in ("cidade_origem", "transportadora"):
+        for valor in todos[dim]:
+            yield {**todos, dim: [valor]}
+
+
+def resultados_selecao(sel, rotas):
+    """Os mesmos resultados que o app memoiza para uma seleção do cubo e suas rotas."""
+    ag = {**resumir_varios(sel, CHAVES_CUBO), CHAVES_ROTAS: rotas}
+    return {
+        "kpis":        kpis(sel, rotas),
+        "performance": tabelas_performance(ag),
+        "mapa":        com_coordenadas(tabelas_mapa(ag)),
+        "custos":      tabelas_custos(ag),
+        "decisao":     tabelas_decisao(ag),
+    }
+
+
+def precalcular(fonte=FONTE, cache_dir=CACHE_DIR):
+    """Calcula e grava os resultados das combinações comuns; retorna o caminho."""
+    meta = assinatura_arquivo(fonte)
+    df = carregar_dataset(fonte, cache_dir)
+    indice = IndiceFiltro(construir_cubo(df))
+    cubo_rotas = CuboRotas.de_linhas(df)
+    datas = indice.frame["data_pedido"]
+    inicio, fim = datas.iloc[0].date(), datas.iloc[-1].date()
+
+    resultados = {}
+    for filtros in combinacoes(indice):
+        sel = indice.filtrar(inicio, fim, **filtros)
+        if sel.empty:
+            continue
+        chave = chave_selecao(inicio, fim, indice.assinatura(inicio, fim, **filtros)[2])
+        resultados[chave] = resultados_selecao(sel, cubo_rotas.resumir(inicio, fim, **filtros))
+
+    arquivo, meta_path = _caminhos(fonte, cache_dir)
+    os.makedirs(os.path.dirname(arquivo), exist_ok=True)
+    tmp = arquivo + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(resultados, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, arquivo)
+    gravar_json(meta_path, meta)
+    return arquivo, len(resultados)
+
+
+def carregar_precalculo(fonte=FONTE, cache_dir=CACHE_DIR):
+    """{chave_selecao: {nome: resultado}}, ou {} se não houver pré-cálculo válido."""
+    if not os.path.isfile(fonte):
+        return {}
+    arquivo, meta_path = _caminhos(fonte, cache_dir)
+    if not (os.path.exists(arquivo) and snapshot_valido(fonte, meta_path)):
+        return {}
+    try:
+        with open(arquivo, "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return {}
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--fonte", default=FONTE)
+    p.add_argument("--cache-dir", default=CACHE_DIR)
+    args = p.parse_args()
+
+    t0 = time.perf_counter()
+    arquivo, n = precalcular(args.fonte, args.cache_dir)
+    print(f"{arquivo}: {n} seleções em {time.perf_counter() - t0:.1f} s")
@@ -0,0 +1,163 @@
+"""Projeção mensal de OTD e custo (Holt-Winters), ajustada para todas as séries de uma vez."""
+from itertools import product
+
+import numpy as np
+import pandas as pd
+
+from amostra import Z95
+from filtros import DIMENSOES_FILTRO
+
+
+# Meses projetados após o último mês da base
+HORIZONTE = 3
+
+# Ciclo sazonal em meses; só é usado com pelo menos dois ciclos de histórico
+PERIODO = 12
+
+# Grade de parâmetros avaliada para todas as séries: suavização do nível,
+# da tendência, amortecimento da tendência e suavização da sazonalidade
+ALFAS = (0.1, 0.3, 0.5, 0.7, 0.9)
+BETAS = (0.05, 0.2, 0.5)
+FIS   = (0.8, 0.9, 0.98)
+GAMAS = (0.05, 0.2, 0.4)
+
+# Séries: uma por combinação das dimensões do filtro, somáveis na exibição
+CHAVES_SERIES = DIMENSOES_FILTRO
+
+
+def ajustar(y, horizonte=HORIZONTE, periodo=PERIODO):
+    """Previsão e desvio padrão `horizonte` meses à frente de cada linha de `y`.
+
+    `y` é uma matriz séries × meses. O modelo é o Holt-Winters aditivo com
+    tendência amortecida, na forma de correção de erro; a recursão avança mês
+    a mês com todas as séries e todas as combinações da grade ao mesmo tempo,
+    e cada série fica com a combinação de menor erro quadrático um passo à
+    frente. Com menos de três meses não há previsão (NaN).
+    """
+    n_series, n_meses = y.shape
+    if n_meses < 3:
+        vazio = np.full((n_series, horizonte), np.nan)
+        return vazio, vazio
+
+    sazonal = n_meses >= 2 * periodo
+    m = periodo if sazonal else 1
+    grade = np.array(list(product(ALFAS, BETAS, FIS, GAMAS if sazonal else (0.0,))))
+    alfa, beta, fi, gama = (grade[:, i, None] for i in range(4))  # (combinações, 1)
+
+    if sazonal:
+        nivel = y[:, :m].mean(axis=1)
+        tendencia = (y[:, m:2 * m].mean(axis=1) - nivel) / m
+        estacao = y[:, :m] - nivel[:, None]
+    else:
+        nivel = y[:, 0]
+        tendencia = y[:, 1] - y[:, 0]
+        estacao = np.zeros((n_series, 1))
+    forma = (len(grade), n_series)
+    nivel = np.broadcast_to(nivel, forma).copy()
+    tendencia = np.broadcast_to(tendencia, forma).copy()
+    estacao = np.broadcast_to(estacao, (*forma, m)).copy()
+
+    sse = np.zeros(forma)
+    for t in range(m, n_meses):
+        s = estacao[:, :, t % m]
+        erro = y[:, t] - (nivel + fi * tendencia + s)
+        sse += erro ** 2
+        nivel = nivel + fi * tendencia + alfa * erro
+        tendencia = fi * tendencia + alfa * beta * erro
+        if sazonal:
+            estacao[:, :, t % m] = s + gama * erro
+
+    melhor = sse.argmin(axis=0)
+    series = np.arange(n_series)
+    alfa, beta, fi, gama = (p[melhor, 0] for p in (alfa, beta, fi, gama))
+    nivel, tendencia = nivel[melhor, series], tendencia[melhor, series]
+    variancia = sse[melhor, series] / (n_meses - m)
+
+    passos = np.arange(1, horizonte + 1)
+    amortecido = np.cumsum(fi[:, None] ** passos, axis=1)        # Σ φ^i, i = 1..h
+    sazon = estacao[melhor, series][:, (n_meses - 1 + passos) % m]
+    previsto = nivel[:, None] + amortecido * tendencia[:, None] + sazon
+
+    # Variância do erro h passos à frente: σ² (1 + Σ_{j<h} c_j²)
+    c = alfa[:, None] * (1 + beta[:, None] * amortecido)
+    if sazonal:
+        c = c + gama[:, None] * (passos % m == 0)
+    acumulado = np.concatenate([np.zeros((n_series, 1)), np.cumsum(c[:, :-1] ** 2, axis=1)], axis=1)
+    desvio = np.sqrt(variancia[:, None] * (1 + acumulado))
+    return previsto, desvio
+
+
+class PrevisoesMensais:
+    """Projeção dos próximos meses de cada série transportadora × hub × status.
+
+    Ajustada uma vez por versão dos dados, a partir do cubo. Pedidos e custo
+    são somas e se somam entre séries; o OTD é projetado como taxa de cada
+    série e combinado pela média ponderada pelos pedidos projetados.
+    """
+
+    def __init__(self, cubo, horizonte=HORIZONTE):
+        mensal = cubo.groupby([*CHAVES_SERIES, "mes"], observed=True)[
+            ["pedidos", "no_prazo", "custo_centavos"]
+        ].sum()
+        meses = mensal.index.get_level_values("mes")
+        meses = pd.date_range(meses.min(), meses.max(), freq="MS") if len(mensal) else pd.DatetimeIndex([])
+        largo = {
+            m: mensal[m].unstack("mes", fill_value=0).reindex(columns=meses, fill_value=0)
+            for m in mensal.columns
+        }
+        pedidos = largo["pedidos"].to_numpy("float64")
+        custo = largo["custo_centavos"].to_numpy("float64") / 100
+        with np.errstate(divide="ignore", invalid="ignore"):
+            otd = largo["no_prazo"].to_numpy("float64") / pedidos
+        # Meses sem pedidos não têm taxa: repete a última observada
+        otd = pd.DataFrame(otd).ffill(axis=1).bfill(axis=1).to_numpy()
+
+        self.ultimo_mes = meses[-1] if len(meses) else None
+        futuros = pd.date_range(meses[-1], periods=horizonte + 1, freq="MS")[1:] if len(meses) else meses
+        prev_pedidos, _ = ajustar(pedidos, horizonte)
+        prev_custo, dp_custo = ajustar(custo, horizonte)
+        prev_otd, dp_otd = ajustar(otd, horizonte)
+
+        chaves = largo["pedidos"].index.to_frame(index=False)
+        tabela = chaves.loc[chaves.index.repeat(horizonte)].reset_index(drop=True)
+        tabela["mes"]      = np.tile(futuros, len(chaves))
+        tabela["pedidos"]  = np.clip(prev_pedidos.ravel(), 0, None)
+        tabela["custo"]    = np.clip(prev_custo.ravel(), 0, None)
+        tabela["custo_dp"] = dp_custo.ravel()
+        tabela["otd"]      = np.clip(prev_otd.ravel(), 0, 1)
+        tabela["otd_dp"]   = dp_otd.ravel()
+        self.tabela = tabela.dropna(subset=["custo", "otd"]).reset_index(drop=True)
+
+    def agregar(self, chaves=("transportadora",), **filtros):
+        """Projeção das séries dos filtros, por mês e `chaves`, com a faixa de 95%.
+
+        Retorna mes, as chaves, otd (%) com otd_inf/otd_sup e custo (R$) com
+        custo_inf/custo_sup; as séries são tratadas como independentes.
+        """
+        sel = self.tabela
+        manter = np.ones(len(sel), dtype=bool)
+        for dim, selecionados in filtros.items():
+            manter = manter & sel[dim].isin(list(selecionados)).to_numpy()
+        sel = sel[manter]
+
+        peso = sel["pedidos"]
+        somas = sel.assign(
+            custo_var=sel["custo_dp"] ** 2,
+            otd_pond=peso * sel["otd"],
+            otd_var=peso ** 2 * sel["otd_dp"] ** 2,
+        ).groupby(["mes", *chaves], observed=True)[
+            ["pedidos", "custo", "custo_var", "otd_pond", "otd_var"]
+        ].sum().reset_index()
+        somas = somas[somas["pedidos"] > 0]
+
+        otd = somas["otd_pond"] / somas["pedidos"] * 100
+        otd_meia = Z95 * np.sqrt(somas["otd_var"]) / somas["pedidos"] * 100
+        custo_meia = Z95 * np.sqrt(somas["custo_var"])
+        return somas[["mes", *chaves]].assign(
+            otd=otd,
+            otd_inf=(otd - otd_meia).clip(lower=0),
+            otd_sup=(otd + otd_meia).clip(upper=100),
+            custo=somas["custo"],
+            custo_inf=(somas["custo"] - custo_meia).clip(lower=0),
+            custo_sup=somas["custo"] + custo_meia,
+        ).reset_index(drop=True)
@@ -0,0 +1,93 @@
+"""Histogramas exatos de prazos em dias, para percentis sob qualquer filtro."""
+import numpy as np
+import pandas as pd
+
+from dados import concatenar, mes_de
+from filtros import DIMENSOES_FILTRO, IndiceFiltro
+
+
+# Medidas em dias (inteiros pequenos) com percentis no dashboard
+MEDIDAS_DIAS = ("prazo_real_dias", "atraso_dias")
+
+# Granularidade dos histogramas: a do filtro da barra lateral (dia e dimensões)
+DIMENSOES = ("data_pedido", *DIMENSOES_FILTRO)
+
+PERCENTIS = (0.5, 0.9, 0.99)
+
+
+def _coluna(medida, valor):
+    return f"{medida}={valor}"
+
+
+class HistogramasDias:
+    """Contagem de pedidos por valor de cada medida em dias, por célula do filtro.
+
+    Como os prazos são inteiros pequenos, o histograma de cada célula (dia ×
+    transportadora × hub × status) é exato e ocupa poucas colunas; somar
+    histogramas de células é somar contagens, então percentis de qualquer
+    seleção ou agrupamento saem da soma, sem voltar às linhas.
+    """
+
+    def __init__(self, celulas):
+        self.celulas = celulas
+        self.colunas = {
+            m: [c for c in celulas.columns if c.startswith(f"{m}=")] for m in MEDIDAS_DIAS
+        }
+        self.indice = IndiceFiltro(celulas)
+
+    @classmethod
+    def de_linhas(cls, df):
+        """Histogramas construídos a partir do frame enriquecido."""
+        chaves = [df[d] for d in DIMENSOES]
+        partes = []
+        for medida in MEDIDAS_DIAS:
+            cont = df.groupby([*chaves, df[medida]], observed=True, sort=True).size()
+            largo = cont.unstack(medida, fill_value=0)
+            largo.columns = [_coluna(medida, int(v)) for v in largo.columns]
+            partes.append(largo)
+        celulas = pd.concat(partes, axis=1).fillna(0).astype("int64").reset_index()
+        return cls(_ordenar(celulas))
+
+    def mesclar(self, outro):
+        """Histogramas somados, p.ex. os atuais e os das linhas recém-chegadas."""
+        juntos = concatenar([self.celulas, outro.celulas])
+        contagens = [c for c in juntos.columns if c not in DIMENSOES and c != "mes"]
+        somados = juntos.groupby(list(DIMENSOES), observed=True, sort=False)[contagens].sum()
+        return HistogramasDias(_ordenar(somados.astype("int64").reset_index()))
+
+    def selecionar(self, data_inicio, data_fim, **filtros):
+        """Células do período e dos filtros (mesma semântica de IndiceFiltro)."""
+        return self.indice.filtrar(data_inicio, data_fim, **filtros)
+
+    def percentis(self, sel, medida, chaves=(), percentis=PERCENTIS):
+        """Percentis de `medida` na seleção, no total ou por grupo de `chaves`.
+
+        Usa a definição do posto mais próximo: o menor valor cuja frequência
+        acumulada alcança p × total. Retorna as chaves e uma coluna p50/p90/...
+        por percentil (grupos sem pedidos ficam de fora).
+        """
+        colunas = self.colunas[medida]
+        valores = np.array([int(c.split("=", 1)[1]) for c in colunas])
+        ordem = np.argsort(valores)
+        if chaves:
+            hist = sel.groupby(list(chaves), observed=True)[colunas].sum()
+            tabela = hist.index.to_frame(index=False)
+            contagens = hist.to_numpy()[:, ordem]
+        else:
+            tabela = pd.DataFrame(index=[0])
+            contagens = sel[colunas].to_numpy().sum(axis=0, keepdims=True)[:, ordem]
+
+        acumulado = contagens.cumsum(axis=1)
+        total = acumulado[:, -1] if acumulado.shape[1] else np.zeros(len(tabela))
+        for p in percentis:
+            posto = np.ceil(p * total).clip(min=1)
+            i = (acumulado < posto[:, None]).sum(axis=1).clip(max=max(len(ordem) - 1, 0))
+            tabela[f"p{round(p * 100):g}"] = valores[ordem][i] if len(ordem) else np.nan
+        tabela["pedidos"] = total
+        return tabela[tabela["pedidos"] > 0].reset_index(drop=True)
+
+
+def _ordenar(celulas):
+    celulas = celulas.sort_values("data_pedido", kind="stable", ignore_index=True)
+    celulas["mes"] = mes_de(celulas["data_pedido"])
+    return celulas
@@ -0,0 +1,108 @@
+"""Cubo mensal de rotas (hub → destino), para o mapa e a contagem de destinos."""
+import numpy as np
+import pandas as pd
+
+from agregacoes import CHAVES_ROTAS, MEDIDAS, construir_cubo, derivar, medidas_linhas, mesclar_cubos
+from filtros import DIMENSOES_FILTRO, IndiceFiltro
+
+
+# Granularidade: mês × dimensões do filtro × destino. O número de células é
+# limitado pelas cardinalidades (não cresce com o número de pedidos)
+DIMENSOES_ROTAS = ("mes", *DIMENSOES_FILTRO, "cidade_destino")
+
+
+class CuboRotas:
+    """Medidas por rota com o filtro de período exato, sem um cubo diário por destino.
+
+    Os meses inteiramente cobertos pelo período vêm do cubo mensal; nos meses
+    cortados pelo período (no início e no fim), só os dias selecionados são
+    somados a partir das linhas, localizadas por um índice de posições por
+    dia construído na primeira consulta que precisar dele.
+
+    `linhas` é uma função que devolve o frame de linhas atual (que pode ser
+    concatenado só quando pedido, ver `BaseDados.frame`).
+    """
+
+    def __init__(self, celulas, linhas, periodo):
+        self.indice = IndiceFiltro(celulas, coluna_data="mes")
+        self.periodo = periodo
+        self._linhas = linhas
+        self._dias = None
+
+    @classmethod
+    def de_linhas(cls, df, linhas=None):
+        """Cubo de rotas construído a partir do frame enriquecido."""
+        periodo = (df["data_pedido"].min(), df["data_pedido"].max())
+        return cls(construir_cubo(df, DIMENSOES_ROTAS), linhas or (lambda: df), periodo)
+
+    def mesclar(self, delta, linhas):
+        """Cubo com as linhas recém-chegadas somadas; `linhas` devolve o frame já com elas."""
+        celulas = mesclar_cubos(self.indice.frame, construir_cubo(delta, DIMENSOES_ROTAS), dimensoes=DIMENSOES_ROTAS)
+        periodo = (min(self.periodo[0], delta["data_pedido"].min()), max(self.periodo[1], delta["data_pedido"].max()))
+        return CuboRotas(celulas, linhas, periodo)
+
+    def _indice_dias(self):
+        """Posições das linhas ordenadas por dia e o início de cada dia nesse array."""
+        if self._dias is None:
+            frame = self._linhas()
+            dias = frame["data_pedido"].to_numpy().astype("datetime64[D]")
+            primeiro = dias.min()
+            relativo = (dias - primeiro).astype("int64")
+            # Poucos dias distintos: ordenação estável em inteiros pequenos (radix)
+            tipo = "uint16" if relativo.max() < 2 ** 16 else "int64"
+            ordem = np.argsort(relativo.astype(tipo), kind="stable")
+            ordem = ordem.astype("int32" if len(frame) < 2 ** 31 else "int64")
+            limites = np.concatenate([[0], np.cumsum(np.bincount(relativo))])
+            self._dias = (frame, primeiro, ordem, limites)
+        return self._dias
+
+    def _somas_linhas(self, data_inicio, data_fim, filtros):
+        """Medidas por rota das linhas dos dias [data_inicio, data_fim] que atendem aos filtros."""
+        frame, primeiro, ordem, limites = self._indice_dias()
+        a = int((np.datetime64(data_inicio.date()) - primeiro).astype("int64"))
+        b = int((np.datetime64(data_fim.date()) - primeiro).astype("int64")) + 1
+        a, b = max(a, 0), min(max(b, 0), len(limites) - 1)
+        pos = np.sort(ordem[limites[a]:limites[max(a, b)]])
+        linhas = frame.take(pos)
+        manter = np.ones(len(linhas), dtype=bool)
+        for dim, selecionados in filtros.items():
+            manter = manter & linhas[dim].isin(list(selecionados)).to_numpy()
+        linhas = linhas[manter]
+        medidas = medidas_linhas(linhas)
+        return medidas.groupby([linhas[c] for c in CHAVES_ROTAS], observed=True)[list(MEDIDAS)].sum()
+
+    def resumir(self, data_inicio, data_fim, **filtros):
+        """Tabela de rotas (CHAVES_ROTAS, medidas, médias e taxas) do período e dos filtros.
+
+        Mesma tabela que `resumir_varios(cubo, [CHAVES_ROTAS])` daria sobre
+        um cubo diário com o destino.
+        """
+        primeiro, ultimo = self.periodo
+        inicio = max(pd.Timestamp(data_inicio), primeiro.normalize())
+        fim = min(pd.Timestamp(data_fim), ultimo.normalize())
+
+        partes = []
+        if inicio <= fim:
+            # Um mês conta como inteiro se o período cobre todos os seus dias com dados
+            mes_ini = inicio.to_period("M").start_time
+            mes_fim = fim.to_period("M").start_time
+            if inicio > max(mes_ini, primeiro.normalize()):
+                mes_ini += pd.offsets.MonthBegin()
+            if fim < min(mes_fim + pd.offsets.MonthEnd(), ultimo.normalize()):
+                mes_fim -= pd.offsets.MonthBegin()
+
+            if mes_ini <= mes_fim:
+                sel = self.indice.filtrar(mes_ini, mes_fim, **filtros)
+                partes.append(sel.groupby(list(CHAVES_ROTAS), observed=True)[list(MEDIDAS)].sum())
+                if inicio < mes_ini:
+                    partes.append(self._somas_linhas(inicio, mes_ini - pd.Timedelta(days=1), filtros))
+                if fim > mes_fim + pd.offsets.MonthEnd():
+                    partes.append(self._somas_linhas(mes_fim + pd.offsets.MonthBegin(), fim, filtros))
+            else:
+                partes.append(self._somas_linhas(inicio, fim, filtros))
+
+        if not partes:
+            vazio = self.indice.frame.iloc[:0]
+            partes.append(vazio.groupby(list(CHAVES_ROTAS), observed=True)[list(MEDIDAS)].sum())
+        somas = partes[0] if len(partes) == 1 else pd.concat(partes).groupby(level=list(CHAVES_ROTAS), observed=True).sum()
+        return derivar(somas.reset_index())
@@ -0,0 +1,132 @@
+"""Gerador de bases sintéticas no esquema do FCD_logistica.csv, para benchmarks.
+
+Uso: python sintetico.py 10M [--saida .cache/sintetico/FCD_10M.csv] [--semente 0]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from mapa import HUB_COORDS
+
+
+TRANSPORTADORAS = ("Correios", "Jadlog", "Loggi", "Azul Cargo")
+HUBS            = tuple(HUB_COORDS)
+
+# Proporções observadas na amostra de 8.000 pedidos
+STATUS = {"Entregue": 0.902, "Em trânsito": 0.077, "Devolvido": 0.021}
+PRAZO_ESTIMADO = (2, 10)          # dias, uniforme
+DESVIO_PRAZO   = (-1, 3)          # prazo_real - prazo_estimado, uniforme
+CUSTO          = (10.0, 300.0)    # R$, uniforme
+PERIODO        = ("2024-01-01", "2024-12-28")
+
+# Ordem de grandeza do número de municípios atendidos numa base completa
+DESTINOS = 5000
+
+_SOBRENOMES = (
+    "Almeida", "Alves", "Aragão", "Araújo", "Azevedo", "Barbosa", "Barros", "Caldeira",
+    "Campos", "Cardoso", "Carvalho", "Castro", "Cavalcanti", "Correia", "Costa", "Costela",
+    "Cunha", "Dias", "Duarte", "Farias", "Fernandes", "Ferreira", "Fogaça", "Freitas",
+    "Gomes", "Gonçalves", "Jesus", "Lima", "Lopes", "Martins", "Melo", "Mendes", "Monteiro",
+    "Moraes", "Moreira", "Moura", "Nascimento", "Nogueira", "Novaes", "Nunes", "Oliveira",
+    "Peixoto", "Pereira", "Pinto", "Pires", "Porto", "Ramos", "Rezende", "Ribeiro", "Rocha",
+    "Rodrigues", "Sales", "Santos", "Silva", "Silveira", "Souza", "Teixeira", "Viana",
+    "Vieira", "da Conceição", "da Costa", "da Cruz", "da Cunha", "da Luz", "da Mata",
+    "da Mota", "da Paz", "da Rocha", "da Rosa", "das Neves",
+)
+_SUFIXOS = (
+    "", " do Sul", " do Norte", " do Oeste", " de Minas", " de Goiás", " Paulista",
+    " Grande", " Alegre", " Verde", " da Praia", " da Serra", " das Flores", " das Pedras",
+    " do Amparo", " do Campo", " dos Dourados", " da Mata", " da Prata", " do Galho",
+)
+
+COLUNAS = (
+    "pedido_id", "data_pedido", "data_entrega", "transportadora", "cidade_origem",
+    "cidade_destino", "prazo_estimado_dias", "prazo_real_dias", "custo_transporte",
+    "status_entrega",
+)
+
+
+def nomes_destinos(n, semente=0):
+    """`n` nomes de cidade distintos, no padrão dos destinos da amostra."""
+    sufixos = _SUFIXOS + tuple(f" de {s}" for s in _SOBRENOMES if s[0].isupper())
+    nomes = [s + suf for suf in sufixos for s in _SOBRENOMES if not suf.endswith(" " + s)]
+    if n > len(nomes):
+        raise ValueError(f"no máximo {len(nomes)} destinos distintos")
+    rng = np.random.default_rng(semente)
+    return [nomes[i] for i in rng.choice(len(nomes), n, replace=False)]
+
+
+def gerar_bloco(n, rng, destinos, pesos, id_inicial=1):
+    """Bloco de `n` pedidos no esquema do CSV (textos já formatados)."""
+    dias = pd.date_range(*PERIODO, freq="D")
+    i_pedido = rng.integers(0, len(dias), n)
+    estimado = rng.integers(PRAZO_ESTIMADO[0], PRAZO_ESTIMADO[1] + 1, n)
+    real = np.maximum(estimado + rng.integers(DESVIO_PRAZO[0], DESVIO_PRAZO[1] + 1, n), 1)
+
+    # Datas formatadas uma vez por dia e espalhadas por índice
+    todas = pd.date_range(dias[0], dias[-1] + pd.Timedelta(days=PRAZO_ESTIMADO[1] + DESVIO_PRAZO[1]))
+    textos = np.asarray(todas.strftime("%d/%m/%Y"), dtype=object)
+
+    return pd.DataFrame({
+        "pedido_id":           id_inicial + rng.permutation(n),
+        "data_pedido":         textos[i_pedido],
+        "data_entrega":        textos[i_pedido + real],
+        "transportadora":      np.asarray(TRANSPORTADORAS, dtype=object)[rng.integers(0, len(TRANSPORTADORAS), n)],
+        "cidade_origem":       np.asarray(HUBS, dtype=object)[rng.integers(0, len(HUBS), n)],
+        "cidade_destino":      destinos[rng.choice(len(destinos), n, p=pesos)],
+        "prazo_estimado_dias": estimado,
+        "prazo_real_dias":     real,
+        "custo_transporte":    np.round(rng.uniform(*CUSTO, n), 2),
+        "status_entrega":      np.asarray(list(STATUS), dtype=object)[
+            rng.choice(len(STATUS), n, p=list(STATUS.values()))
+        ],
+    }, columns=COLUNAS)
+
+
+def gerar_csv(linhas, saida, destinos=DESTINOS, semente=0, bloco=1_000_000):
+    """Grava um CSV sintético com `linhas` pedidos, em blocos (memória constante).
+
+    Destinos seguem uma cauda longa (pesos tipo Zipf), como na amostra, onde
+    poucas cidades concentram muitos pedidos e a maioria aparece poucas vezes.
+    """
+    nomes = np.asarray(nomes_destinos(destinos, semente), dtype=object)
+    pesos = 1.0 / np.arange(1, destinos + 1) ** 0.6
+    pesos /= pesos.sum()
+
+    os.makedirs(os.path.dirname(saida) or ".", exist_ok=True)
+    tmp = saida + ".tmp"
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        for i, inicio in enumerate(range(0, linhas, bloco)):
+            rng = np.random.default_rng([semente, i])
+            df = gerar_bloco(min(bloco, linhas - inicio), rng, nomes, pesos, id_inicial=inicio + 1)
+            df.to_csv(f, sep=";", index=False, header=(i == 0), float_format="%.2f")
+    os.replace(tmp, saida)
+    return saida
+
+
+def parse_linhas(texto):
+    """'1M' → 1_000_000, '500k' → 500_000, '8000' → 8000."""
+    texto = texto.strip().upper()
+    mult = {"K": 1_000, "M": 1_000_000}.get(texto[-1:], 1)
+    return int(float(texto.rstrip("KM")) * mult)
+
+
+def caminho_padrao(linhas, cache_dir=".cache"):
+    return os.path.join(cache_dir, "sintetico", f"FCD_{linhas}.csv")
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("linhas", type=parse_linhas, help="número de pedidos (ex.: 1M, 10M, 50M)")
+    p.add_argument("--saida")
+    p.add_argument("--destinos", type=int, default=DESTINOS)
+    p.add_argument("--semente", type=int, default=0)
+    args = p.parse_args()
+
+    saida = args.saida or caminho_padrao(args.linhas)
+    t0 = time.perf_counter()
+    gerar_csv(args.linhas, saida, args.destinos, args.semente)
+    print(f"{saida}: {args.linhas:,} linhas em {time.perf_counter() - t0:.1f} s")
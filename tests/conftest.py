@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from dados import enriquecer, ler_csv  # noqa: E402
+
+
+CSV = os.path.join(RAIZ, "FCD_logistica.csv")
+
+
+@pytest.fixture(scope="session")
+def csv_exemplo():
+    return CSV
+
+
+@pytest.fixture(scope="session")
+def df(csv_exemplo):
+    """Dataset de exemplo enriquecido, lido direto do CSV (sem snapshot)."""
+    return enriquecer(ler_csv(csv_exemplo))
+
+
+@pytest.fixture
+def selecao(df):
+    """Período com meses cortados no início e no fim e uma restrição em cada dimensão."""
+    datas = df["data_pedido"]
+    inicio = (datas.min() + pd.Timedelta(days=40)).normalize()
+    fim = (datas.max() - pd.Timedelta(days=50)).normalize()
+    filtros = {
+        "transportadora": sorted(df["transportadora"].unique())[1:],
+        "cidade_origem":  sorted(df["cidade_origem"].unique())[:-1],
+        "status_entrega": sorted(df["status_entrega"].unique())[1:],
+    }
+    return inicio, fim, filtros
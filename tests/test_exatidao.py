@@ -0,0 +1,149 @@
+"""Estruturas pré-agregadas e caminhos rápidos conferidos contra o cálculo direto com pandas/numpy."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from agregacoes import construir_cubo, kpis, resumir
+from dados import ArquivoReescrito, LeitorIncremental, enriquecer, ler_csv
+from exportacao import COLUNAS_FONTE, exportar
+from filtros import IndiceFiltro
+from pedidos import ExploradorPedidos
+from quantis import HistogramasDias
+from rotas import CuboRotas
+
+
+def _mascara(frame, inicio, fim, filtros):
+    """Referência: máscara booleana do período (dias inteiros) e dos filtros."""
+    datas = frame["data_pedido"]
+    manter = (datas >= inicio) & (datas < fim + pd.Timedelta(days=1))
+    for dim, valores in filtros.items():
+        manter = manter & frame[dim].isin(valores)
+    return manter.to_numpy()
+
+
+def test_kpis_do_cubo_iguais_ao_groupby(df, selecao):
+    inicio, fim, filtros = selecao
+    sel = IndiceFiltro(construir_cubo(df)).filtrar(inicio, fim, **filtros)
+    rotas = CuboRotas.de_linhas(df).resumir(inicio, fim, **filtros)
+    linhas = df[_mascara(df, inicio, fim, filtros)]
+
+    k = kpis(sel, rotas)
+    assert k["total_pedidos"] == len(linhas)
+    assert k["no_prazo"] == linhas["no_prazo"].sum()
+    assert k["custo_total"] == pytest.approx(linhas["custo_transporte"].astype("float64").sum())
+    assert k["tempo_medio"] == pytest.approx(linhas["prazo_real_dias"].mean())
+    assert k["destinos"] == linhas["cidade_destino"].nunique()
+
+    por_transp = resumir(sel, ("transportadora",)).set_index("transportadora")
+    esperado = linhas.groupby("transportadora", observed=True).agg(
+        pedidos=("pedido_id", "size"), prazo_real=("prazo_real_dias", "sum"), atraso=("atraso_dias", "sum"),
+    )
+    pd.testing.assert_frame_equal(
+        por_transp[["pedidos", "prazo_real", "atraso"]].sort_index(), esperado.sort_index(),
+        check_dtype=False, check_index_type=False,
+    )
+
+    por_rota = rotas.set_index(["cidade_origem", "cidade_destino"])["pedidos"].sort_index()
+    esperado = linhas.groupby(["cidade_origem", "cidade_destino"], observed=True).size().sort_index()
+    pd.testing.assert_series_equal(por_rota, esperado, check_dtype=False, check_names=False, check_index_type=False)
+
+
+def test_selecionar_igual_a_mascara(df, selecao):
+    inicio, fim, filtros = selecao
+    indice = IndiceFiltro(df)
+    pos = indice.selecionar(inicio, fim, **filtros)
+    np.testing.assert_array_equal(pos, np.flatnonzero(_mascara(indice.frame, inicio, fim, filtros)))
+
+    # Todos os valores marcados: só o período restringe, e a seleção é uma fatia
+    todos = {dim: list(df[dim].unique()) for dim in filtros}
+    pos = indice.selecionar(inicio, fim, **todos)
+    assert isinstance(pos, slice)
+    np.testing.assert_array_equal(np.arange(len(indice))[pos], np.flatnonzero(_mascara(indice.frame, inicio, fim, {})))
+
+
+def test_percentis_iguais_ao_numpy(df, selecao):
+    inicio, fim, filtros = selecao
+    hist = HistogramasDias.de_linhas(df)
+    linhas = df[_mascara(df, inicio, fim, filtros)]
+
+    # Grupos grandes e grupos de poucos pedidos (dia × transportadora), onde o posto pesa mais
+    for medida in ("prazo_real_dias", "atraso_dias"):
+        for chaves in [(), ("transportadora",), ("data_pedido", "transportadora")]:
+            tabela = hist.percentis(hist.selecionar(inicio, fim, **filtros), medida, chaves)
+            grupos = linhas.groupby(list(chaves), observed=True)[medida] if chaves else [((), linhas[medida])]
+            esperado = {
+                chave if isinstance(chave, tuple) else (chave,): np.percentile(valores, [50, 90, 99], method="inverted_cdf")
+                for chave, valores in grupos
+            }
+            assert len(tabela) == len(esperado)
+            for linha in tabela.itertuples(index=False):
+                chave = tuple(getattr(linha, c) for c in chaves)
+                assert [linha.p50, linha.p90, linha.p99] == list(esperado[chave])
+
+
+@pytest.mark.parametrize("coluna", ["custo_transporte", "data_pedido", "pedido_id"])
+@pytest.mark.parametrize("crescente", [True, False])
+def test_fatia_igual_a_sort_values(df, selecao, coluna, crescente):
+    inicio, fim, filtros = selecao
+    explorador = ExploradorPedidos(df)
+    mascara = explorador.mascara(inicio, fim, **filtros)
+    # Empates ficam na ordem das linhas (crescente) ou na ordem inversa (decrescente)
+    sel = df[mascara] if crescente else df[mascara].iloc[::-1]
+    esperado = sel.sort_values(coluna, ascending=crescente, kind="stable").index.to_numpy()
+
+    # Páginas em sequência, cada uma continuando do cursor da anterior
+    cursor = (0, 0)
+    for inicio_pag in range(0, len(esperado) + 100, 100):
+        pos, cursor = explorador.fatia(mascara, coluna, crescente, inicio_pag, 100, cursor)
+        np.testing.assert_array_equal(pos, esperado[inicio_pag:inicio_pag + 100])
+
+    # Página avulsa, sem cursor
+    pos, _ = explorador.fatia(mascara, coluna, crescente, 1234, 50)
+    np.testing.assert_array_equal(pos, esperado[1234:1284])
+
+
+def test_leitor_incremental_anexacao_e_truncamento(df, csv_exemplo, tmp_path):
+    with open(csv_exemplo, "rb") as f:
+        todas = f.read().splitlines(keepends=True)
+    fonte = tmp_path / "fonte.csv"
+    fonte.write_bytes(b"".join(todas[:1001]))
+    leitor = LeitorIncremental(str(fonte), cache_dir=str(tmp_path / "cache"))
+
+    inicial = leitor.carregar()
+    assert len(inicial) == 1000
+    assert leitor.novos() is None
+
+    # Linha incompleta no fim: só as completas entram
+    with open(fonte, "ab") as f:
+        f.write(b"".join(todas[1001:1101]) + todas[1101][:10])
+    novos = leitor.novos()
+    np.testing.assert_array_equal(novos["pedido_id"], df["pedido_id"].iloc[1000:1100])
+
+    with open(fonte, "ab") as f:
+        f.write(todas[1101][10:])
+    novos = leitor.novos()
+    assert novos["pedido_id"].tolist() == [int(todas[1101].split(b";")[0])]
+
+    # Arquivo reescrito menor: não é anexação
+    fonte.write_bytes(b"".join(todas[:501]))
+    with pytest.raises(ArquivoReescrito):
+        leitor.novos()
+
+
+def test_exportacao_csv_ida_e_volta(df, selecao, tmp_path):
+    inicio, fim, filtros = selecao
+    mascara = _mascara(df, inicio, fim, filtros)
+    destino = tmp_path / "exportacao.csv"
+
+    linhas = exportar(df, mascara, str(destino), bloco=1000)
+    assert linhas == mascara.sum()
+    assert list(pd.read_csv(destino, sep=";", nrows=0).columns) == list(COLUNAS_FONTE)
+
+    # O arquivo exportado é lido como a fonte original
+    relido = enriquecer(ler_csv(str(destino)))
+    esperado = df[mascara].reset_index(drop=True)
+    categoricas = {c: str for c in COLUNAS_FONTE if isinstance(df[c].dtype, pd.CategoricalDtype)}
+    pd.testing.assert_frame_equal(
+        relido[list(COLUNAS_FONTE)].astype(categoricas), esperado[list(COLUNAS_FONTE)].astype(categoricas),
+    )
+    assert not list(tmp_path.glob("*.tmp"))